@@ -1,7 +1,10 @@
 from flask import Blueprint
 from flask_restx import Api
 
+from app.handlers import api_handlers
+
 from .roles import api as roles_api
+from .system import api as system_api
 from .users import api as user_api
 
 api_v1_bp = Blueprint("v1", __name__, url_prefix="/v1")
@@ -17,3 +20,6 @@ api_v1 = Api(
 
 api_v1.add_namespace(roles_api)
 api_v1.add_namespace(user_api)
+api_v1.add_namespace(system_api)
+
+api_handlers(api_v1)
@@ -1,7 +1,13 @@
+from typing import TYPE_CHECKING, List
+
 from app.database import BaseModel
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql.schema import Column
 from sqlalchemy.sql.sqltypes import String
 
+if TYPE_CHECKING:
+    from ...users.models import User
+
 
 class Role(BaseModel):
     """contains basic roles for the aplication"""
@@ -10,6 +16,11 @@ class Role(BaseModel):
     name = Column(String, nullable=False)
     description = Column(String, nullable=False, server_default="")
 
+    # role's members, memberships are written through UserRoles
+    users: List["User"] = relationship(
+        "User", secondary="user_roles", viewonly=True, order_by="User.id"
+    )
+
     def __init__(self, name: str, description: str) -> None:
         self.name = name
         self.description = description
@@ -1,38 +1,59 @@
+from functools import partial
+from typing import Dict, List
+
 from flask_jwt_extended import jwt_required
 from flask_restx import Resource, fields
 from flask_restx.reqparse import RequestParser
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.expression import and_
 
-from app.database import db
+from app.database import after_commit, commit, unit_of_work
 from app.exceptions import InvalidUsage
+from app.extensions import identity_cache
 from app.utils.decorators import has_roles
 from app.utils.extended_objects import ExtendedNameSpace
 from app.utils.helpers import argument_list_type
+from app.utils.marshalling import marshal
+from app.utils.parsers import cursor_parser
 
 from ..users.models import User, UserRoles
-from ..users.resources import user_model
 from .models import Role
 
 api = ExtendedNameSpace("roles", description="Roles operations")
 
 
-roles_model = api.model(
-    "Role",
+role_member_model = api.model(
+    "RoleMember", {"id": fields.Integer(), "username": fields.String()}
+)
+
+role_model = api.model(
+    "RoleInfo",
     {
         "id": fields.Integer(),
         "name": fields.String(),
         "description": fields.String(),
-        "users": fields.List(
-            fields.Nested(user_model, skip_none=True),
-            attribute=lambda role: User.query.join(
-                UserRoles, UserRoles.user_id == User.id
-            )
-            .with_entities(User.id.label("id"), User.username.label("username"))
-            .filter(UserRoles.role_id == role.id)
-            .all(),
-        ),
     },
 )
 
+roles_model = api.inherit(
+    "Role", role_model, {"users": fields.List(fields.Nested(role_member_model))}
+)
+
+roles_list_model = api.model(
+    "RolesList", {"data": fields.List(fields.Nested(roles_model))}
+)
+
+include_parser = api.parser()
+include_parser.add_argument(
+    "include",
+    choices=["users", "none"],
+    default="users",
+    type=str,
+    location="args",
+    required=False,
+    help="Include each role's members, none leaves them out",
+)
+
 role_parser_required = RequestParser()
 role_parser_required.add_argument(
     "name", required=True, location="form", type=str
@@ -48,15 +69,26 @@ role_parser.add_argument("name", location="form", type=str).add_argument(
 class RolesResource(Resource):
     @jwt_required()
     @has_roles("admin")
-    @api.marshal_list_with(roles_model, envelope="data")
+    @api.expect(include_parser)
+    @api.response(
+        200, "roles, with their members unless left out", model=roles_list_model
+    )
     def get(self):
+        """Lists roles, members are loaded in a single query unless left out"""
+        args = include_parser.parse_args()
+        if args.get("include") != "none":
+            roles = Role.query.options(
+                selectinload(Role.users).load_only(User.id, User.username)
+            ).all()
+            return marshal(roles, roles_model, envelope="data")
 
-        return Role.query.all()
+        return marshal(Role.query.all(), role_model, envelope="data")
 
     @jwt_required()
     @has_roles("admin")
     @api.marshal_list_with(roles_model)
     @api.expect(role_parser_required)
+    @unit_of_work()
     def post(self):
         args = role_parser.parse_args()
         new_role = Role(**args)
@@ -76,6 +108,39 @@ user_ids_parser.add_argument(
 
 users_ids_model = api.model("users_ids", {"users": fields.List(fields.Integer)})
 
+membership_model = api.model(
+    "RoleMembership",
+    {
+        "results": fields.List(
+            fields.Nested(
+                api.model(
+                    "MembershipResult",
+                    {
+                        "id": fields.Integer(description="User's id"),
+                        "status": fields.String(
+                            description="added, exists, not_found, removed"
+                            " or not_member"
+                        ),
+                    },
+                )
+            )
+        )
+    },
+)
+
+
+def membership_response(results: Dict[int, str]) -> Dict[str, List[Dict]]:
+    """Commits membership changes and drops changed users' cached sessions"""
+    for user_id, status in results.items():
+        if status in ("added", "removed"):
+            after_commit(partial(identity_cache.invalidate_user, user_id))
+    commit()
+    return {
+        "results": [
+            {"id": user_id, "status": status} for user_id, status in results.items()
+        ]
+    }
+
 
 @api.param("role_id", "role's id", type=int)
 class RoleResource(Resource):
@@ -90,19 +155,15 @@ class RoleResource(Resource):
     @has_roles("admin")
     @api.marshal_with(roles_model)
     @api.expect(users_ids_model, validate=True)
+    @unit_of_work()
     def post(self, role_id: int):
-        role_ = Role.get(role_id)
+        role_: Role = Role.query.filter(Role.id == role_id).first_or_404()
 
         args = user_ids_parser.parse_args()
-        if User.query.filter(User.id.in_(args.get("users"))).count() != len(
-            args.get("users")
-        ):
+        results = UserRoles.add_users(role_.id, args["users"])
+        if "not_found" in results.values():
             raise InvalidUsage.custom_error("Can't add these users", 401)
-        db.session.add_all(
-            [UserRoles(user_id=user_id, role=role_) for user_id in args["users"]]
-        )
-
-        db.session.commit()
+        membership_response(results)
 
         return role_
 
@@ -110,13 +171,74 @@ class RoleResource(Resource):
     @api.expect(role_parser)
     @has_roles("admin")
     @api.marshal_with(roles_model)
+    @unit_of_work()
     def put(self, role_id: int):
         args = role_parser.parse_args()
         role: Role = Role.query.filter(Role.id == role_id).first_or_404()
+        # cached identities hold role names
+        after_commit(identity_cache.clear)
         role.update(**args, ignore_none=True)
 
         return role
 
 
+@api.param("role_id", "role's id", type=int)
+class RoleUsersResource(Resource):
+    @jwt_required()
+    @has_roles("admin")
+    @api.doc("list a role's users")
+    @api.expect(cursor_parser)
+    @api.serialize_multi(
+        role_member_model, User, description="role's members", order_by=["id"]
+    )
+    def get(self, role_id: int):
+        """Lists a role's members page by page"""
+        role_: Role = Role.query.filter(Role.id == role_id).first_or_404()
+
+        return User.query.join(
+            UserRoles, and_(UserRoles.user_id == User.id, UserRoles.role_id == role_.id)
+        )
+
+    @jwt_required()
+    @has_roles("admin")
+    @api.doc("add users to a role")
+    @api.marshal_with(membership_model)
+    @api.expect(users_ids_model, validate=True)
+    @unit_of_work()
+    def post(self, role_id: int):
+        """Adds users to a role, existing members are left as is"""
+        role_: Role = Role.query.filter(Role.id == role_id).first_or_404()
+        args = user_ids_parser.parse_args()
+
+        return membership_response(UserRoles.add_users(role_.id, args["users"]))
+
+    @jwt_required()
+    @has_roles("admin")
+    @api.doc("remove users from a role")
+    @api.marshal_with(membership_model)
+    @api.expect(users_ids_model, validate=True)
+    @unit_of_work()
+    def delete(self, role_id: int):
+        """Removes users from a role"""
+        role_: Role = Role.query.filter(Role.id == role_id).first_or_404()
+        args = user_ids_parser.parse_args()
+
+        return membership_response(UserRoles.remove_users(role_.id, args["users"]))
+
+    @jwt_required()
+    @has_roles("admin")
+    @api.doc("replace a role's users")
+    @api.marshal_with(membership_model)
+    @api.expect(users_ids_model, validate=True)
+    @unit_of_work()
+    def put(self, role_id: int):
+        """Sets a role's members to the given users, removing the others"""
+        role_: Role = Role.query.filter(Role.id == role_id).first_or_404()
+        args = user_ids_parser.parse_args()
+
+        return membership_response(UserRoles.replace_users(role_.id, args["users"]))
+
+
 api.add_resource(RolesResource, "/")
 api.add_resource(RoleResource, "/<role_id>")
+api.add_resource(RoleUsersResource, "/<role_id>/users")
@@ -0,0 +1,25 @@
+from flask_jwt_extended import jwt_required
+from flask_restx import Resource
+
+from app.database import db
+from app.extensions import identity_cache
+from app.utils.decorators import has_roles
+from app.utils.extended_objects import ExtendedNameSpace
+
+api = ExtendedNameSpace("system", description="System operations")
+
+
+class StatsResource(Resource):
+    @jwt_required()
+    @has_roles("admin")
+    @api.doc("worker's runtime counters")
+    def get(self):
+        """Gets runtime counters of the worker serving the request"""
+
+        return {
+            "identityCache": identity_cache.stats(),
+            "pool": db.get_engine().pool.stats(),
+        }
+
+
+api.add_resource(StatsResource, "/stats")
@@ -1,16 +1,25 @@
 import uuid
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Union
 
-from app.database import BaseModel
+from app.database import BaseModel, after_commit, commit, db
+from app.extensions import identity_cache
 from flask.globals import current_app
-from sqlalchemy.sql.schema import Column, ForeignKey
+from flask.signals import Namespace
+from sqlalchemy import delete, select
+from sqlalchemy.sql.schema import Column, ForeignKey, Index
 from sqlalchemy.sql.sqltypes import BOOLEAN, INTEGER, TIMESTAMP, String
 
 if TYPE_CHECKING:
     from ._User import User
 
 
+_signals = Namespace()
+
+# sent with the revoked sessions' (user_id, token) pairs once they're committed
+sessions_revoked = _signals.signal("sessions-revoked")
+
+
 class Session(BaseModel):
     """table for user's active sessions"""
 
@@ -33,6 +42,15 @@ class Session(BaseModel):
     created_at = Column(
         TIMESTAMP(True), nullable=False, comment="session's creation date"
     )
+    expires_at = Column(
+        TIMESTAMP(True), nullable=False, comment="session's expiry date"
+    )
+
+    __table_args__ = (
+        Index("ix_sessions_token", "token"),
+        Index("ix_sessions_user_id", "user_id"),
+        Index("ix_sessions_expires_at", "expires_at"),
+    )
 
     def __init__(
         self, user: "User", token: str, ip_address: str, platform: str, browser: str
@@ -44,3 +62,79 @@ class Session(BaseModel):
         self.browser = browser
         self.slug = str(uuid.uuid4())
         self.created_at = datetime.now(tz=current_app.config["TZ"])
+        self.expires_at = (
+            self.created_at + current_app.config["JWT_ACCESS_TOKEN_EXPIRES"]
+        )
+
+    @classmethod
+    def prune_expired(cls, batch_size: int = 1000) -> int:
+        """Deletes a batch of expired sessions and returns how many were deleted
+
+        Each batch is committed on its own so row locks are held briefly.
+        """
+        now = datetime.now(tz=current_app.config["TZ"])
+        expired = select(cls.id).where(cls.expires_at <= now).limit(batch_size)
+        deleted = db.session.execute(
+            delete(cls.__table__).where(cls.id.in_(expired.scalar_subquery()))
+        ).rowcount
+        db.session.commit()
+        return deleted
+
+    @classmethod
+    def revoke(
+        cls,
+        user_ids: Union[int, Iterable[int], None],
+        keep_token: Optional[str] = None,
+        persist: bool = True,
+    ) -> List[Tuple[int, str]]:
+        """Deletes users' sessions in a single statement
+
+        Revoked sessions are dropped from the identity cache and
+        ``sessions_revoked`` is sent once they're committed, receivers can't
+        use the database session.
+
+        Args:
+            user_ids (int|Iterable[int]|None): users whose sessions are
+                revoked, every user's when None
+            keep_token (str, optional): token of a session to keep, e.g. the
+                current one. Defaults to None.
+            persist (bool, optional): Commit changes. Defaults to True.
+
+        Returns:
+            List[Tuple[int, str]]: revoked sessions' user ids & tokens
+        """
+        criteria = []
+        if isinstance(user_ids, int):
+            criteria.append(cls.user_id == user_ids)
+        elif user_ids is not None:
+            criteria.append(cls.user_id.in_(list(user_ids)))
+        if keep_token is not None:
+            criteria.append(cls.token != keep_token)
+
+        statement = delete(cls.__table__).where(*criteria)
+        if db.engine.dialect.full_returning:
+            revoked = db.session.execute(
+                statement.returning(cls.user_id, cls.token)
+            ).all()
+        else:
+            # deleting the selected rows keeps the returned tokens exact
+            revoked = db.session.execute(
+                select(cls.id, cls.user_id, cls.token).where(*criteria)
+            ).all()
+            db.session.execute(
+                delete(cls.__table__).where(cls.id.in_([row.id for row in revoked]))
+            )
+        revoked = [(row.user_id, row.token) for row in revoked]
+
+        if revoked:
+            app = current_app._get_current_object()
+
+            def notify():
+                for _, token in revoked:
+                    identity_cache.invalidate(token)
+                sessions_revoked.send(app, revoked=revoked)
+
+            after_commit(notify)
+        if persist:
+            commit()
+        return revoked
@@ -1,15 +1,18 @@
 import re
-from typing import TYPE_CHECKING, Any, List, Union
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING, Any, List, Optional, Union
 
-from app.database import BaseModel, db
+from app.database import BaseModel, after_commit, db
 from app.exceptions import UserExceptions
+from app.extensions import identity_cache, password_hasher
 from app.utils.file_storage import FileStorage
 from flask import current_app
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql.expression import cast
-from sqlalchemy.sql.schema import Column
+from sqlalchemy.orm import contains_eager, relationship
+from sqlalchemy.sql.expression import and_, cast
+from sqlalchemy.sql.functions import func
+from sqlalchemy.sql.schema import Column, Index
 from sqlalchemy.sql.sqltypes import BOOLEAN, String
-from werkzeug.security import check_password_hash, generate_password_hash
 
 if TYPE_CHECKING:
     from ...roles.models import Role
@@ -28,9 +31,13 @@ class PasswordHelper:
 
     def __eq__(self, o: object) -> bool:
         assert isinstance(o, str)
-        equality: bool = check_password_hash(self.password, o)
+        equality: bool = password_hasher.verify(self.password, o)
         return equality
 
+    @property
+    def needs_rehash(self) -> bool:
+        return password_hasher.needs_rehash(self.password)
+
 
 class User(BaseModel):
     """Holds users' data"""
@@ -60,6 +67,12 @@ class User(BaseModel):
     first_name = Column(String, nullable=False, comment="First Name")
     last_name = Column(String, nullable=False, server_default="", comment="Last Name")
 
+    # serve case insensitive login lookups
+    __table_args__ = (
+        Index("ix_users_lower_username", func.lower(username)),
+        Index("ix_users_lower_email", func.lower(email)),
+    )
+
     # Uncomment to if you want to add manager employee relations
     # manager_id = Column(String, nullable=True)
     # manager: "User" = relationship(
@@ -100,7 +113,7 @@ class User(BaseModel):
         if password != password_check:
             raise UserExceptions.password_check_invalid()
         self.username = username
-        self._password = generate_password_hash(password)
+        self._password = password_hasher.hash(password)
         self.active = active
         self.email = email
         self._photo = photo
@@ -114,23 +127,62 @@ class User(BaseModel):
             regx = re.compile(current_app.config["PASSWORD_RULE"])
             if not regx.match(value):
                 raise UserExceptions.password_check_invalid()
-            self._password = value
+            name, value = "_password", password_hasher.hash(value)
         return super().__setattr__(name, value)
 
     @hybrid_property
     def photo(self) -> FileStorage:
         return FileStorage(url=self._photo)
 
+    @photo.setter
+    def photo(self, url: str) -> None:
+        self._photo = url
+
     @hybrid_property
     def password(self) -> PasswordHelper:
         """password proxy helper"""
         return PasswordHelper(self._password)
 
+    def rehash_password(self, password: str) -> None:
+        """Rehashes a verified password with the configured hash settings"""
+        self._password = password_hasher.hash(password)
+
     @hybrid_property
     def name(self) -> str:
         """concatenates user's name"""
         return f"{self.first_name} {self.last_name}"
 
+    @classmethod
+    def get_by_session(cls, token: str, user_id: int) -> Optional["User"]:
+        """Gets user through one of its sessions in a single query
+
+        Roles are eager loaded in the same statement, expired sessions are
+        ignored.
+
+        Args:
+            token (str): session's token
+            user_id (int): User id.
+        Returns:
+            The user if the session is valid, None otherwise
+        """
+        from ._Session import Session
+
+        now = datetime.now(tz=current_app.config["TZ"])
+        return (
+            cls.query.join(
+                Session,
+                and_(
+                    Session.user_id == cls.id,
+                    Session.token == token,
+                    Session.expires_at > now,
+                ),
+            )
+            .outerjoin(cls.roles)
+            .options(contains_eager(cls.roles))
+            .filter(cls.id == user_id)
+            .one_or_none()
+        )
+
     def add_roles(self, roles: Union[List["Role"], "Role"]):
         """add roles to user
 
@@ -146,7 +198,29 @@ class User(BaseModel):
 
         db.session.add_all(new_roles)
 
+    def update(self, ignore_none: bool = False, **kwargs):
+        """Updates user's record and drops its cached sessions"""
+        after_commit(partial(identity_cache.invalidate_user, self.id))
+        super().update(ignore_none=ignore_none, **kwargs)
+
+    def release_photo(self) -> None:
+        """Deletes user's photo unless other users share it
+
+        Uploads are content addressed, users uploading the same image get the
+        same url.
+        """
+        if not self._photo:
+            return
+        shared = (
+            db.session.query(User.id)
+            .filter(User._photo == self._photo, User.id != self.id)
+            .first()
+        )
+        if shared is None:
+            self.photo.delete()
+
     def delete(self, persist=False):
         """Delete user's record"""
-        self.photo.delete()
+        self.release_photo()
+        after_commit(partial(identity_cache.invalidate_user, self.id))
         super().delete(persist=persist)
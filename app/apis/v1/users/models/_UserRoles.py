@@ -1,7 +1,8 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, List
 
-from app.database import BaseModel
-from sqlalchemy.sql.schema import Column, ForeignKeyConstraint
+from app.database import BaseModel, db, in_ids, insert_ignore
+from sqlalchemy.sql.expression import and_, not_
+from sqlalchemy.sql.schema import Column, ForeignKeyConstraint, Index
 from sqlalchemy.sql.sqltypes import INTEGER
 
 if TYPE_CHECKING:
@@ -28,6 +29,7 @@ class UserRoles(BaseModel):
             refcolumns=["roles.id"],
             ondelete="CASCADE",
         ),
+        Index("ix_user_roles_user_id_role_id", "user_id", "role_id", unique=True),
     )
 
     def __init__(self, role: "Role", user: "User" = None, user_id: int = None) -> None:
@@ -35,3 +37,85 @@ class UserRoles(BaseModel):
         assert id_ is not None
         self.user_id = id_
         self.role_id = role.id
+
+    @classmethod
+    def add_users(cls, role_id: int, user_ids: List[int]) -> Dict[int, str]:
+        """Adds users to a role in a single insert, skipping existing members
+
+        Args:
+            role_id (int): role's id
+            user_ids (List[int]): users' ids
+        Returns:
+            Each id's status, "added", "exists" or "not_found"
+        """
+        from ._User import User
+
+        ids = list(dict.fromkeys(user_ids))
+        found = (
+            db.session.query(User.id, cls.id)
+            .outerjoin(cls, and_(cls.user_id == User.id, cls.role_id == role_id))
+            .filter(in_ids(User.id, ids))
+        )
+        results = {id_: "not_found" for id_ in ids}
+        for user_id, member_id in found:
+            results[user_id] = "exists" if member_id is not None else "added"
+        rows = [
+            {"user_id": user_id, "role_id": role_id}
+            for user_id, status in results.items()
+            if status == "added"
+        ]
+        # bounded statements' parameters count
+        for start in range(0, len(rows), 1000):
+            db.session.execute(
+                insert_ignore(
+                    cls.__table__, rows[start : start + 1000], ["user_id", "role_id"]
+                )
+            )
+        return results
+
+    @classmethod
+    def remove_users(cls, role_id: int, user_ids: List[int]) -> Dict[int, str]:
+        """Removes users from a role in a single delete
+
+        Returns:
+            Each id's status, "removed" or "not_member"
+        """
+        ids = list(dict.fromkeys(user_ids))
+        members = {
+            user_id
+            for user_id, in db.session.query(cls.user_id).filter(
+                cls.role_id == role_id, in_ids(cls.user_id, ids)
+            )
+        }
+        if members:
+            db.session.execute(
+                cls.__table__.delete().where(
+                    and_(cls.role_id == role_id, in_ids(cls.user_id, members))
+                )
+            )
+        return {id_: "removed" if id_ in members else "not_member" for id_ in ids}
+
+    @classmethod
+    def replace_users(cls, role_id: int, user_ids: List[int]) -> Dict[int, str]:
+        """Sets a role's members to the given users
+
+        Returns:
+            Each given id's status as returned by ``add_users``, and "removed"
+            for members not given
+        """
+        ids = list(dict.fromkeys(user_ids))
+        removed = {
+            user_id
+            for user_id, in db.session.query(cls.user_id).filter(
+                cls.role_id == role_id, not_(in_ids(cls.user_id, ids))
+            )
+        }
+        if removed:
+            db.session.execute(
+                cls.__table__.delete().where(
+                    and_(cls.role_id == role_id, in_ids(cls.user_id, removed))
+                )
+            )
+        results = cls.add_users(role_id, ids)
+        results.update({user_id: "removed" for user_id in removed})
+        return results
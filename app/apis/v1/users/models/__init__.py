@@ -1,3 +1,3 @@
-from ._Session import Session
+from ._Session import Session, sessions_revoked
 from ._User import User
 from ._UserRoles import UserRoles
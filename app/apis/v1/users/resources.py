@@ -1,7 +1,8 @@
-from typing import Dict, List
+from functools import partial
+from typing import Dict
 
 import werkzeug
-from flask import jsonify, request
+from flask import request
 from flask.helpers import make_response
 from flask.wrappers import Response
 from flask_jwt_extended import current_user, jwt_required
@@ -14,17 +15,22 @@ from flask_jwt_extended.utils import (
     unset_jwt_cookies,
 )
 from flask_principal import RoleNeed
-from flask_restx import Resource, marshal
+from flask_restx import Resource
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql.expression import or_
 from sqlalchemy.sql.functions import func
 
-from app.database import db
+from app.database import after_commit, commit, unit_of_work
 from app.exceptions import InvalidUsage, UserExceptions
+from app.extensions import identity_cache
 from app.utils import g
 from app.utils.decorators import has_roles
+from app.utils.export import EXPORT_MIMETYPES, stream_export
 from app.utils.extended_objects import ExtendedNameSpace
-from app.utils.file_storage import FileStorage
-from app.utils.parsers import offset_parser
+from app.utils.file_storage import IMAGE_CONTENT_TYPES, FileStorage
+from app.utils.json_encoding import json_response
+from app.utils.marshalling import marshal
+from app.utils.parsers import cursor_parser, export_parser
 
 from .models import Session, User
 from .parsers import user_info_parser, user_login_parser, user_parser
@@ -59,6 +65,7 @@ class UsersResource(Resource):
     @api.marshal_with(user_model)
     @api.expect(user_parser)
     @has_roles("admin")
+    @unit_of_work()
     def post(self):
         """Creates new user - requires admin permission-."""
         args = user_parser.parse_args()
@@ -84,14 +91,15 @@ class UserResource(Resource):
     @api.doc("update user's info")
     @api.marshal_with(user_model)
     @api.expect(user_info_parser)
+    @unit_of_work()
     def put(self, user_id: int = None):
         """Updates user's info"""
         if user_id != current_user.id:
             raise InvalidUsage.user_not_authorized()
         args: Dict = user_info_parser.parse_args()
 
-        newpwd = args.pop("newpwd")
-        pwdcheck = args.pop("pwdcheck")
+        newpwd = args.pop("password")
+        pwdcheck = args.pop("password_check")
 
         if newpwd:
             if newpwd != pwdcheck:
@@ -101,15 +109,23 @@ class UserResource(Resource):
         photo: werkzeug.datastructures.FileStorage = args.pop("photo")
 
         if photo:
-            photostorage = FileStorage(data=photo.stream, name=photo.filename)
+            photostorage = FileStorage(
+                data=photo.stream,
+                name=photo.filename,
+                content_types=IMAGE_CONTENT_TYPES,
+                variants=True,
+            )
             photostorage.save()
-            current_user.photo = photostorage.url
+            if photostorage.url != current_user._photo:
+                current_user.release_photo()
+                current_user.photo = photostorage.url
 
         for key, val in args.items():
             if hasattr(current_user, key) and val is not None:
                 setattr(current_user, key, val)
 
-        db.session.commit()
+        after_commit(partial(identity_cache.invalidate_user, current_user.id))
+        commit()
 
         return current_user
 
@@ -128,6 +144,7 @@ class UserResource(Resource):
             location="form",
         )
     )
+    @unit_of_work()
     def delete(self, user_id: int = None):
         """Deletes user's account permenantly"""
         args = user_login_parser.parse_args()
@@ -143,20 +160,25 @@ class UserResource(Resource):
             or not args.get("confirm", False)
         ):
             raise UserExceptions.wrong_login_creds()
-        user.delete()
-        response: Response = jsonify({"message": "User Account deleted succefully!"})
+        user.delete(True)
+        response: Response = json_response(
+            {"message": "User Account deleted succefully!"}
+        )
         unset_jwt_cookies(response)
         return response
 
 
 class Logout(Resource):
+    @jwt_required()
     @api.doc("logout user and invalidate session")
+    @unit_of_work()
     def get(self):
 
         active_session_token = get_jwt()["jti"]
 
+        after_commit(partial(identity_cache.invalidate, active_session_token))
         Session.get(token=active_session_token).delete(True)
-        response: Response = jsonify({"message": "User logged out!"})
+        response: Response = json_response({"message": "User logged out!"})
         response.delete_cookie("csrftoken")
         unset_jwt_cookies(response)
 
@@ -168,6 +190,7 @@ class Login(Resource):
     @api.response(200, "Successful login", model=user_model)
     @api.response(404, "Invalid url")
     @api.expect(user_login_parser)
+    @unit_of_work()
     def post(self):
         """User's login view"""
         args = user_login_parser.parse_args()
@@ -180,6 +203,9 @@ class Login(Resource):
 
         if not user or user.password != args.get("password", None):
             raise UserExceptions.wrong_login_creds()
+        if user.password.needs_rehash:
+            # persisted along with the new session
+            user.rehash_password(args["password"])
         token = create_access_token(user)
         user.token = get_csrf_token(token)
         user_session = Session(
@@ -209,10 +235,12 @@ class UserSession(Resource):
 
     @jwt_required()
     @api.marshal_with(session_model)
+    @unit_of_work()
     def delete(self, user_id: int, slug: str):
         if current_user.id != user_id and not g.identity.provides(RoleNeed("admin")):
             raise InvalidUsage.user_not_authorized()
         user_session = Session.get(slug=slug, user_id=user_id)
+        after_commit(partial(identity_cache.invalidate, user_session.token))
         user_session.delete(True)
 
         return
@@ -221,26 +249,23 @@ class UserSession(Resource):
 @api.param("user_id", "user's id", type=int)
 class UserSessions(Resource):
     @jwt_required()
-    @api.expect(offset_parser)
-    @api.serialize_multi(session_model, Session, description="User's Active Sessions")
+    @api.expect(cursor_parser)
+    @api.serialize_multi(
+        session_model,
+        Session,
+        description="User's Active Sessions",
+        order_by=["created_at"],
+    )
     def get(self, user_id: int = None):
         """Gets a list of user's active sessions"""
-        args = offset_parser.parse_args()
 
-        user_sessions = (
-            Session.query.filter(
-                Session.user_id == user_id,
-            )
-            .order_by(Session.id.asc())
-            .offset(args.get("offset", 0))
-            .limit(args.get("limit", 10))
-            .all()
+        return Session.query.filter(
+            Session.user_id == user_id,
         )
 
-        return user_sessions
-
     @jwt_required()
     @api.serialize_multi(session_model, Session, description="User's Active Sessions")
+    @unit_of_work()
     def delete(self, user_id: int = None, slug: str = None):
         """Invalidates all users sessions except the current sessions"""
         user = User.get(id=user_id)
@@ -250,20 +275,48 @@ class UserSessions(Resource):
 
         active_session_token = get_jwt()["jti"]
 
-        user_sessions: List[Session] = Session.query.filter(
-            Session.user_id == user.id
+        Session.revoke(user.id, keep_token=active_session_token)
+        return Session.query.filter(
+            Session.user_id == user.id, Session.token == active_session_token
         ).all()
-        for session_ in user_sessions:
-            if session_.token != active_session_token:
-                session_.delete(True)
-        return [
-            session_
-            for session_ in user_sessions
-            if session_.token == active_session_token
-        ]
+
+
+class UsersExport(Resource):
+    @jwt_required()
+    @api.expect(export_parser)
+    @api.produces(list(EXPORT_MIMETYPES.values()))
+    @has_roles("admin")
+    def get(self):
+        """Streams all users as NDJSON or CSV -requires admin permission-"""
+        args = export_parser.parse_args()
+        return stream_export(
+            User.query.options(selectinload(User.roles)).order_by(User.id),
+            user_model,
+            args["format"],
+            "users",
+        )
+
+
+@api.param("user_id", "user's id", type=int)
+class UserSessionsExport(Resource):
+    @jwt_required()
+    @api.expect(export_parser)
+    @api.produces(list(EXPORT_MIMETYPES.values()))
+    def get(self, user_id: int):
+        """Streams all of user's sessions as NDJSON or CSV"""
+        if current_user.id != user_id and RoleNeed("admin") not in g.identity.provides:
+            raise InvalidUsage.user_not_authorized()
+        args = export_parser.parse_args()
+        return stream_export(
+            Session.query.filter(Session.user_id == user_id).order_by(Session.id),
+            session_model,
+            args["format"],
+            f"user-{user_id}-sessions",
+        )
 
 
 api.add_resource(UsersResource, "/")
+api.add_resource(UsersExport, "/export")
 api.add_resource(Login, "/login")
 api.add_resource(Logout, "/logout")
 api.add_resource(UserResource, "/<int:user_id>", endpoint="user")
@@ -272,6 +325,7 @@ api.add_resource(
     "/<int:user_id>/sessions",
     endpoint="sessions",
 )
+api.add_resource(UserSessionsExport, "/<int:user_id>/sessions/export")
 api.add_resource(
     UserSession,
     "/<int:user_id>/sessions/<slug>",
@@ -2,6 +2,7 @@ from flask_jwt_extended.utils import get_jwt
 from flask_restx import fields
 
 from app.utils import UrlWArgs
+from app.utils.marshalling import IsCurrent
 
 user_serializer = {
     "id": fields.Integer(description="User unique identifier"),
@@ -10,6 +11,10 @@ user_serializer = {
     "active": fields.Boolean,
     "email": fields.String(description="User's email"),
     "photo": fields.String(description="Url for user's avatar", attribute="photo.url"),
+    "photoVariants": fields.Raw(
+        description="Urls for resized versions of user's avatar by their names",
+        attribute="photo.variants",
+    ),
     "mobile": fields.String,
     "roles": fields.List(
         fields.String(attribute="name"), description="A list of user roles"
@@ -31,8 +36,9 @@ session_serializer = {
     "createdAt": fields.DateTime(
         attribute="created_at", description="Session creation date"
     ),
-    "active": fields.Boolean(
-        attribute=lambda session_: session_.token == get_jwt().get("jti", None),
+    "active": IsCurrent(
+        attribute="token",
+        current=lambda: get_jwt().get("jti", None),
         description="If this is the current active sessions",
     ),
     "url": UrlWArgs(
@@ -1,6 +1,7 @@
 from flask import Flask
 
 from app.apis.v1 import api_v1_bp
+from app.utils.file_storage import files_bp
 
 
 def register_blueprints(app: "Flask") -> "Flask":
@@ -16,5 +17,6 @@ def register_blueprints(app: "Flask") -> "Flask":
         Flask: Flask Application instance
     """
     app.register_blueprint(api_v1_bp)
+    app.register_blueprint(files_bp)
 
     return app
@@ -3,6 +3,8 @@
 import json
 import os
 import re
+import time
+from datetime import datetime
 from getpass import getpass
 from subprocess import call
 from typing import TYPE_CHECKING, List
@@ -350,6 +352,161 @@ def migrate():
         )
 
 
+@click.command()
+@click.option(
+    "--once",
+    default=False,
+    is_flag=True,
+    help="Exit once no jobs are due instead of polling",
+)
+@click.option("--batch-size", default=10, help="Jobs claimed at a time")
+@click.option("--interval", default=1.0, help="Seconds to wait when idle")
+@with_appcontext
+def storage_worker(once: bool, batch_size: int, interval: float):
+    """Process queued file storage jobs.
+
+    Idle workers also remove staged files no job references, at most once per
+    ``STORAGE_QUEUE_SWEEP_AGE`` seconds.
+    """
+    from app.utils.file_storage.jobs import process_jobs, sweep_staged
+
+    swept_at = None
+    while True:
+        if process_jobs(batch_size):
+            continue
+        sweep_age = current_app.config["STORAGE_QUEUE_SWEEP_AGE"]
+        if swept_at is None or time.monotonic() - swept_at >= sweep_age:
+            sweep_staged()
+            swept_at = time.monotonic()
+        if once:
+            break
+        time.sleep(interval)
+
+
+@click.command()
+@click.option("--batch-size", default=1000, help="Sessions deleted at a time")
+@click.option("--pause", default=0.0, help="Seconds to wait between batches")
+@click.option(
+    "--ahead", default=2, help="Monthly partitions kept ahead, when partitioned"
+)
+@with_appcontext
+def sessions_prune(batch_size: int, pause: float, ahead: int):
+    """Delete expired sessions in batches.
+
+    Partitions holding expired sessions only are dropped whole when the
+    sessions table is partitioned, and upcoming ones are created.
+    """
+    from app.apis.v1.users.models import Session
+    from app.database import db
+    from app.utils.partitions import (
+        create_monthly_partitions,
+        drop_monthly_partitions,
+        is_partitioned,
+        month_start,
+    )
+
+    now = datetime.now(tz=current_app.config["TZ"])
+    if is_partitioned(Session.__tablename__):
+        created = create_monthly_partitions(
+            Session.__tablename__, now, month_start(now, ahead)
+        )
+        dropped = drop_monthly_partitions(Session.__tablename__, now)
+        db.session.commit()
+        click.echo(f"Created partitions: {', '.join(created) or '-'}")
+        click.echo(f"Dropped partitions: {', '.join(dropped) or '-'}")
+
+    total = 0
+    while True:
+        deleted = Session.prune_expired(batch_size)
+        total += deleted
+        if deleted < batch_size:
+            break
+        time.sleep(pause)
+    click.echo(f"Deleted {total} expired sessions")
+
+
+@click.command()
+@click.argument("user_ids", nargs=-1, type=int)
+@click.option(
+    "--all", "all_users", default=False, is_flag=True, help="Revoke every session"
+)
+@with_appcontext
+def sessions_revoke(user_ids: List[int], all_users: bool):
+    """Revoke all sessions of the given users, e.g. after a security incident."""
+    from app.apis.v1.users.models import Session
+
+    if not user_ids and not all_users:
+        raise click.UsageError("Pass user ids or --all")
+    revoked = Session.revoke(None if all_users else user_ids)
+    click.echo(f"Revoked {len(revoked)} sessions")
+
+
+@click.command()
+@click.option("--ahead", default=2, help="Monthly partitions created ahead")
+@with_appcontext
+def sessions_partition(ahead: int):
+    """Convert sessions into a table partitioned by month of expiry.
+
+    PostgreSQL only, the table is locked while its rows are copied. Slugs are
+    unique per expiry date afterwards, as unique constraints of partitioned
+    tables must include the partition key.
+
+    The test suite runs on SQLite and doesn't verify the PostgreSQL
+    statements, try this on a copy of the database first.
+    """
+    from sqlalchemy import text
+
+    from app.apis.v1.users.models import Session
+    from app.database import db
+    from app.utils.partitions import (
+        copy_rows,
+        create_monthly_partitions,
+        is_partitioned,
+        month_start,
+    )
+
+    if db.engine.dialect.name != "postgresql":
+        raise click.ClickException("Partitioning requires PostgreSQL")
+    if is_partitioned("sessions"):
+        click.echo("sessions is already partitioned")
+        return
+
+    now = datetime.now(tz=current_app.config["TZ"])
+    oldest = db.session.execute(text("SELECT min(expires_at) FROM sessions")).scalar()
+    for statement in [
+        "LOCK TABLE sessions IN ACCESS EXCLUSIVE MODE",
+        "ALTER TABLE sessions RENAME TO sessions_unpartitioned",
+        "ALTER TABLE sessions_unpartitioned DROP CONSTRAINT uq_sessions_slug",
+        "DROP INDEX ix_sessions_token",
+        "DROP INDEX ix_sessions_user_id",
+        "DROP INDEX ix_sessions_expires_at",
+        "CREATE TABLE sessions (LIKE sessions_unpartitioned"
+        " INCLUDING DEFAULTS INCLUDING COMMENTS) PARTITION BY RANGE (expires_at)",
+        "ALTER TABLE sessions ADD CONSTRAINT pk_sessions"
+        " PRIMARY KEY (id, expires_at)",
+        "ALTER TABLE sessions ADD CONSTRAINT uq_sessions_slug"
+        " UNIQUE (slug, expires_at)",
+        "ALTER TABLE sessions ADD CONSTRAINT fk_sessions_user_id_users"
+        " FOREIGN KEY (user_id) REFERENCES users (id)",
+        "CREATE TABLE sessions_default PARTITION OF sessions DEFAULT",
+    ]:
+        db.session.execute(text(statement))
+    created = create_monthly_partitions(
+        "sessions", oldest or now, month_start(now, ahead)
+    )
+    copy_rows("sessions_unpartitioned", Session.__table__)
+    for statement in [
+        "ALTER SEQUENCE sessions_id_seq OWNED BY sessions.id",
+        "DROP TABLE sessions_unpartitioned",
+        "CREATE INDEX ix_sessions_token ON sessions (token)",
+        "CREATE INDEX ix_sessions_user_id ON sessions (user_id)",
+        "CREATE INDEX ix_sessions_expires_at ON sessions (expires_at)",
+    ]:
+        db.session.execute(text(statement))
+    db.session.commit()
+    click.echo(f"Partitioned sessions into: {', '.join(created)}")
+
+
 def register_commands(app: Flask) -> Flask:
     """Register Click commands."""
     app.cli.add_command(add_roles, "add-roles")
@@ -360,5 +517,9 @@ def register_commands(app: Flask) -> Flask:
     app.cli.add_command(test)
     app.cli.add_command(urls)
     app.cli.add_command(migrate)
+    app.cli.add_command(storage_worker, "storage-worker")
+    app.cli.add_command(sessions_prune, "sessions-prune")
+    app.cli.add_command(sessions_partition, "sessions-partition")
+    app.cli.add_command(sessions_revoke, "sessions-revoke")
 
     return app
@@ -1,15 +1,39 @@
+import logging
+import random
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import TYPE_CHECKING, Type, TypeVar, Union
+from functools import lru_cache
+from threading import Lock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
-from flask.globals import current_app
+from flask import Flask, has_request_context, request
+from flask.globals import current_app, g
+from flask.wrappers import Response
 from flask_jwt_extended import current_user
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
 from flask_sqlalchemy.model import Model
-from sqlalchemy import Column, and_, text
+from sqlalchemy import Column, any_, bindparam, event, orm, select, text
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declared_attr
 from sqlalchemy.ext.mutable import Mutable
-from sqlalchemy.sql.expression import cast, or_
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.expression import cast
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 from sqlalchemy.sql.schema import ForeignKey, MetaData, Table
 from sqlalchemy.sql.sqltypes import BOOLEAN, INTEGER, Boolean, DateTime, String
 
@@ -27,6 +51,54 @@ metadata = MetaData(
 
 T = TypeVar("T")
 
+logger = logging.getLogger(__name__)
+
+# requests whose reads may be served by replicas
+SAFE_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+# set after a client's write, its reads stick to the primary while it lasts
+REPLICA_STICKY_COOKIE = "db_primary"
+
+
+@contextmanager
+def unit_of_work() -> Iterator["scoped_session"]:
+    """Batches model helpers' commits in a single one
+
+    Within the block ``save``, ``update``, ``delete`` and ``cancel`` only flush
+    their changes, the session is committed once on exit and rolled back when
+    an exception, e.g. ``InvalidUsage``, is raised. Nested blocks join the
+    outermost one. Also usable as a decorator, ``@unit_of_work()``.
+    """
+    depth = g.get("_unit_of_work", 0)
+    g._unit_of_work = depth + 1
+    try:
+        yield db.session
+        if not depth:
+            db.session.commit()
+    except BaseException:
+        if not depth:
+            db.session.rollback()
+        raise
+    finally:
+        g._unit_of_work = depth
+
+
+def commit() -> None:
+    """Commits the session, or only flushes it within a unit of work"""
+    if g.get("_unit_of_work", 0):
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def after_commit(callback: Callable[[], Any]) -> None:
+    """Runs callback once the session's transaction is committed
+
+    Callbacks are dropped when it's rolled back instead, so cache
+    invalidations and signals only follow changes other requests can see.
+    Register them before committing, they can't emit SQL on the session.
+    """
+    db.session.info.setdefault("after_commit", []).append(callback)
+
 
 class ExtendedModel(Model):
     __table__: Table
@@ -42,11 +114,14 @@ class ExtendedModel(Model):
                 setattr(self, key, kwargs.get(key))
         if hasattr(self, "updated_at"):
             self.updated_at = datetime.now(tz=current_app.config["TZ"])
-        db.session.commit()
+        commit()
 
     @classmethod
     def get(cls: T, id: int = None, **kwargs) -> Union[T, None]:
         """Gets class instance using id or named attributes
+
+        Lookups by id only go through the session's identity map, others run a
+        statement built once per attribute combination.
         Args:
             id (int, optional): User id.
             kwargs: named arguments must be an attribute of the class
@@ -55,18 +130,19 @@ class ExtendedModel(Model):
         """
         for arg in kwargs.keys():
             assert hasattr(cls, arg)
+        if id is not None and not kwargs:
+            return db.session.get(cls, id)
+        if id is not None:
+            kwargs = {"id": id, **kwargs}
+        statement = _get_statement(
+            cls, tuple((arg, val is None) for arg, val in kwargs.items())
+        )
         return (
-            db.session.query(cls)
-            .filter(
-                and_(
-                    or_(getattr(cls, "id") == id, id == None),
-                    *[
-                        getattr(cls, arg) == val
-                        for arg, val in kwargs.items()
-                        if hasattr(cls, arg)
-                    ],
-                )
+            db.session.execute(
+                statement,
+                {f"get_{arg}": val for arg, val in kwargs.items() if val is not None},
             )
+            .scalars()
             .one_or_none()
         )
 
@@ -83,7 +159,7 @@ class ExtendedModel(Model):
         """
         db.session.add(self)
         if persist:
-            db.session.commit()
+            commit()
 
     def delete(self, persist=False):
         """Deletes instance from database
@@ -93,10 +169,165 @@ class ExtendedModel(Model):
         """
         db.session.delete(self)
         if persist:
-            db.session.commit()
+            commit()
 
 
-db = SQLAlchemy(model_class=ExtendedModel, metadata=metadata)
+class ReplicaState:
+    """An app's replica engines and when failing replicas may be retried"""
+
+    def __init__(self, sa: "RoutingSQLAlchemy", app: Flask) -> None:
+        self.sa = sa
+        self.app = app
+        self.engines: Dict[str, Engine] = {}
+        self.down_until: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def engine(self, uri: str) -> Engine:
+        with self._lock:
+            if uri not in self.engines:
+                sa_url, options = self.sa.apply_driver_hacks(
+                    self.app, make_url(uri), self.sa.apply_pool_defaults(self.app, {})
+                )
+                options.update(self.app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+                self.engines[uri] = self.sa.create_engine(sa_url, options)
+            return self.engines[uri]
+
+    def available(self) -> List[str]:
+        """Replicas' urls in random order, skipping recently failed ones"""
+        now = time.monotonic()
+        uris = [
+            uri
+            for uri in self.app.config["SQLALCHEMY_REPLICAS"]
+            if self.down_until.get(uri, 0) <= now
+        ]
+        random.shuffle(uris)
+        return uris
+
+    def mark_down(self, uri: str) -> None:
+        self.down_until[uri] = time.monotonic() + self.app.config["REPLICA_RETRY_AFTER"]
+
+
+class RoutingSession(SignallingSession):
+    """Sends reads of safe requests to a replica and everything else to the
+    primary
+
+    A session sticks to the primary once it writes, and a client's requests
+    do too for ``REPLICA_STICKY_SECONDS`` after one of its writes, so clients
+    read their own writes. Only flushes and DML statements count as writes,
+    other statements than selects use the primary without sticking to it.
+    Units of work always use the primary. A replica is connected to when
+    first picked by a session, one failing to connect is skipped for
+    ``REPLICA_RETRY_AFTER`` seconds and reads fall back to the primary when
+    none is available.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        bind = super().get_bind(mapper, clause)
+        if bind is not self.bind:
+            # models with their own __bind_key__
+            return bind
+        flushing, reads = self._flushing_or_reading(clause)
+        if flushing or getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+            g._db_wrote = True
+            return bind
+        if not reads or self.info.get("wrote") or not self._replica_reads():
+            return bind
+        return self._replica() or bind
+
+    def _flushing_or_reading(self, clause) -> Tuple[bool, bool]:
+        """Whether the session is flushing and whether ``clause`` is a select
+        without FOR UPDATE, lambda statements being resolved first
+
+        These are private to SQLAlchemy, the attributes are as of the 1.4
+        release pinned in requirements/production.txt and need rechecking
+        when upgrading it.
+        """
+        if isinstance(clause, StatementLambdaElement):
+            clause = clause._resolved
+        return (
+            self._flushing,
+            isinstance(clause, Select) and clause._for_update_arg is None,
+        )
+
+    def _replica_reads(self) -> bool:
+        return (
+            bool(self.app.config["SQLALCHEMY_REPLICAS"])
+            and has_request_context()
+            and request.method in SAFE_METHODS
+            and REPLICA_STICKY_COOKIE not in request.cookies
+            and not g.get("_unit_of_work", 0)
+        )
+
+    def _replica(self) -> Optional[Engine]:
+        if "replica" in self.info:
+            return self.info["replica"]
+        state: ReplicaState = self.app.extensions["replicas"]
+        self.info["replica"] = None
+        for uri in state.available():
+            engine = state.engine(uri)
+            try:
+                self.connection(bind_arguments={"bind": engine})
+            except DBAPIError as e:
+                logger.warning("Replica %r is unavailable: %r", engine.url, e)
+                state.mark_down(uri)
+                continue
+            self.info["replica"] = engine
+            break
+        return self.info["replica"]
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with sessions routing reads to ``SQLALCHEMY_REPLICAS``"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def init_app(self, app: Flask) -> None:
+        super().init_app(app)
+        app.extensions["replicas"] = ReplicaState(self, app)
+
+        @app.after_request
+        def stick_to_primary(response: Response) -> Response:
+            if g.get("_db_wrote") and app.config["SQLALCHEMY_REPLICAS"]:
+                response.set_cookie(
+                    REPLICA_STICKY_COOKIE,
+                    "1",
+                    max_age=app.config["REPLICA_STICKY_SECONDS"],
+                    secure=app.config["SESSION_COOKIE_SECURE"],
+                    httponly=True,
+                    samesite="Lax",
+                )
+            return response
+
+
+db = RoutingSQLAlchemy(model_class=ExtendedModel, metadata=metadata)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _run_after_commit(session: RoutingSession) -> None:
+    for callback in session.info.pop("after_commit", []):
+        callback()
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _drop_after_commit(session: RoutingSession, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop("after_commit", None)
+
+
+@lru_cache(maxsize=None)
+def _get_statement(cls: Type[ExtendedModel], args: Tuple[Tuple[str, bool], ...]):
+    """Select statement of ``ExtendedModel.get``, attributes are bound by name
+    or compared to NULL"""
+    return select(cls).where(
+        *[
+            getattr(cls, arg).is_(None)
+            if is_none
+            else getattr(cls, arg) == bindparam(f"get_{arg}")
+            for arg, is_none in args
+        ]
+    )
 
 
 class ViewModel(object):
@@ -123,6 +354,7 @@ class ViewModel(object):
 
 if TYPE_CHECKING:
     from flask_sqlalchemy.model import Model
+    from sqlalchemy.orm import scoped_session
 
     BaseModel: Type[ExtendedModel] = db.make_declarative_base(ExtendedModel)
 else:
@@ -161,7 +393,29 @@ class CancelableModel(object):
         self.cancelled = True
         self.cancelled_by_id = current_user.id
         self.date_cancelled = datetime.now(tz=current_app.config["TZ"])
-        db.session.commit()
+        commit()
+
+
+def in_ids(column: Column, ids: List[int]):
+    """Matches column against a list of ids
+
+    Postgresql gets the whole list as one array parameter, ``column = ANY(:ids)``,
+    instead of a parameter per id.
+    """
+    if db.engine.dialect.name == "postgresql":
+        return column == any_(bindparam(None, list(ids), type_=ARRAY(INTEGER)))
+    return column.in_(list(ids))
+
+
+def insert_ignore(table: Table, rows: List[Dict], index_elements: List[str]):
+    """Builds a multi-row insert skipping rows conflicting on index_elements"""
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return (
+        insert(table).values(rows).on_conflict_do_nothing(index_elements=index_elements)
+    )
 
 
 def ArrayList(_type, dimensions=1):
@@ -1,6 +1,3 @@
-from flask import jsonify
-
-
 def template(
     data,
     code=500,
@@ -29,10 +26,12 @@ class InvalidUsage(Exception):
         self.payload = payload
 
     def to_json(self):
+        from app.utils.json_encoding import json_response
+
         rv = {
             "errors": self.errors,
         }
-        return jsonify(rv), self.status_code
+        return json_response(rv), self.status_code
 
     @classmethod
     def custom_error(cls, message, code=500):
@@ -63,8 +62,15 @@ class InvalidUsage(Exception):
         return cls(**UNSUPPORTED_FORMAT)
 
     @classmethod
-    def size_limit_exceeded(cls):
-        return cls(**SIZE_LIMIT_EXCEEDED)
+    def size_limit_exceeded(cls, max_size: int = None):
+        if max_size is None:
+            return cls(**SIZE_LIMIT_EXCEEDED)
+        size = (
+            f"{max_size / 1024 ** 2:g}MB"
+            if max_size >= 1024 ** 2
+            else f"{max_size / 1024:g}KB"
+        )
+        return cls.custom_error(f"File size is larger than {size}", code=400)
 
     @classmethod
     def invalid_search_params(cls):
@@ -94,10 +100,12 @@ class UserExceptions(Exception):
         self.payload = payload
 
     def to_json(self):
+        from app.utils.json_encoding import json_response
+
         rv = {
             "errors": self.errors,
         }
-        return jsonify(rv), self.status_code
+        return json_response(rv), self.status_code
 
     @classmethod
     def user_already_registered(cls):
@@ -5,10 +5,13 @@ from flask_principal import Principal
 
 from app.database import db
 from app.handlers import jwt_handlers
+from app.utils.cache import IdentityCache
+from app.utils.password_hasher import PasswordHasher
 
 jwt = JWTManager()
 migrate = Migrate()
-principal = Principal()
+identity_cache = IdentityCache()
+password_hasher = PasswordHasher()
 
 
 def register_extensions(app: Flask) -> Flask:
@@ -29,12 +32,19 @@ def register_extensions(app: Flask) -> Flask:
 
     migrate.init_app(app, db)
 
-    # Configure flask_principal
-    principal.init_app(app)
+    # Configure flask_principal, its session identity loader & saver only run
+    # when identities are resolved through its signals
+    app.extensions["principal"] = Principal(
+        app, use_sessions=app.config["IDENTITY_SIGNALS"]
+    )
 
     # Configure JWT and its loaders
     jwt.init_app(app)
 
     jwt_handlers(jwt, app)
 
+    identity_cache.init_app(app)
+
+    password_hasher.init_app(app)
+
     return app
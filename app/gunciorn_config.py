@@ -1,4 +1,6 @@
 import os
 
 bind = "unix:///tmp/nginx.socket"
+# every worker keeps its own connection pool, the database should accept
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
 workers = int(os.getenv("GUNICORN_WORKERS", str(os.cpu_count() or 1))) * 2
@@ -1,6 +1,7 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Union
 
 from flask.app import Flask
+from flask.globals import current_app, g
 from flask_jwt_extended.exceptions import CSRFError
 from flask_jwt_extended.jwt_manager import JWTManager
 from flask_principal import (
@@ -10,8 +11,11 @@ from flask_principal import (
     identity_changed,
     identity_loaded,
 )
+from flask_restx import Api
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from app.exceptions import InvalidUsage, UserExceptions
+from app.utils.json_encoding import JSONEncoder, json_response
 
 if TYPE_CHECKING:
     from app.apis.v1.users.models import User
@@ -28,25 +32,37 @@ def jwt_handlers(jwt: JWTManager, app: Flask):
 
     def user_lookup_callback(_jwt_header, jwt_data):
 
-        from app.apis.v1.users.models import Session, User
+        from app.apis.v1.users.models import User
+        from app.extensions import identity_cache
 
-        session = Session.get(token=jwt_data["jti"], user_id=jwt_data["user"])
-        if not session:
-            raise InvalidUsage.invalid_session()
+        jti = jwt_data["jti"]
         user_id = jwt_data["user"]
-        user = User.get(user_id)
-        if not user or not user.active:
+        cached = identity_cache.get(jti)
+        if cached is None:
+            user = User.get_by_session(token=jti, user_id=user_id)
+            if not user:
+                raise InvalidUsage.invalid_session()
+            cached = identity_cache.store(jti, user)
+        if not cached.active:
             raise InvalidUsage.user_not_authorized()
         identity = Identity(user_id)
         identity.provides.add(UserNeed(user_id))
 
-        # Assuming the User model has a list of roles, update the
-        # identity with the roles that the user provides
-        for role in user.roles:
-            identity.provides.add(RoleNeed(role.name))
-        identity_changed.send(app, identity=identity)
-
-        return user
+        # update the identity with the roles that the user provides
+        for role in cached.roles:
+            identity.provides.add(RoleNeed(role))
+        # role names checked by has_roles without going through the needs
+        identity.roles = cached.roles
+        if app.config["IDENTITY_SIGNALS"]:
+            identity_changed.send(app, identity=identity)
+        else:
+            # skips principal's identity savers & signal fan-out, identity
+            # loaded receivers still run when plugins connect some
+            g.identity = identity
+            if identity_loaded.has_receivers_for(app):
+                identity_loaded.send(app, identity=identity)
+
+        return identity_cache.attach(cached)
 
     def invalid_token_loader_callback(*args):
 
@@ -59,10 +75,29 @@ def jwt_handlers(jwt: JWTManager, app: Flask):
     jwt.invalid_token_loader(invalid_token_loader_callback)
 
 
-def invalid_error_handler(e: InvalidUsage):
+def invalid_error_handler(e: Union[InvalidUsage, UserExceptions]):
     return e.to_json()
 
 
+def api_handlers(api: Api):
+    """Registers error handlers on a restx api, restx handles errors raised in
+    its resources before flask's error handlers"""
+
+    def invalid_usage_handler(e: Union[InvalidUsage, UserExceptions]):
+        message = "; ".join(e.errors) if isinstance(e.errors, list) else e.errors
+        return {"errors": e.errors, "message": message}, e.status_code
+
+    def request_too_large_handler(e: RequestEntityTooLarge):
+        return invalid_usage_handler(
+            InvalidUsage.size_limit_exceeded(current_app.config["MAX_UPLOAD_SIZE"])
+        )
+
+    api.errorhandler(InvalidUsage)(invalid_usage_handler)
+    api.errorhandler(UserExceptions)(invalid_usage_handler)
+    api.errorhandler(RequestEntityTooLarge)(request_too_large_handler)
+    api.representation("application/json")(json_response)
+
+
 def invalid_csrf(e: CSRFError):
     raise UserExceptions.wrong_login_creds()
 
@@ -83,9 +118,13 @@ def register_handlers(app: Flask) -> Flask:
     Returns:
         Flask: Flask Application instance
     """
-    identity_loaded.connect_via(app)(on_identity_loaded)
+    if app.config["IDENTITY_SIGNALS"]:
+        identity_loaded.connect_via(app)(on_identity_loaded)
+
+    app.json_encoder = JSONEncoder
 
     app.errorhandler(InvalidUsage)(invalid_error_handler)
+    app.errorhandler(UserExceptions)(invalid_error_handler)
     app.errorhandler(CSRFError)
 
     return app
@@ -1,10 +1,33 @@
 import os
 import random
 import string
+import tempfile
 from datetime import timedelta
+from typing import Any, Dict
 
 import pytz
-from sqlalchemy.pool import NullPool
+
+from app.utils.pool import InstrumentedNullPool, InstrumentedQueuePool
+
+
+def engine_options() -> Dict[str, Any]:
+    """Builds sqlalchemy engine options from environment variables
+
+    DB_POOL_MODE selects between a per-worker ``queue`` pool and
+    ``pgbouncer``, which opens a connection per checkout and leaves pooling
+    to a pgbouncer instance in front of the database.
+    """
+    if os.getenv("DB_POOL_MODE", "queue").lower() == "pgbouncer":
+        return {"poolclass": InstrumentedNullPool}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower()
+        in ("1", "true", "yes"),
+    }
 
 
 class Config(object):
@@ -27,8 +50,61 @@ class Config(object):
 
     # Regex rule to check against user's password
     PASSWORD_RULE = os.getenv("PASSWORD_RULE", ".*")
-    # Storage target to handle file storage
+    # Werkzeug hash method, users' hashes are upgraded on login when it changes
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:150000")
+    PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+    # Run hashing "inline" or on a bounded "thread" or "process" pool
+    PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "inline")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    # Max concurrent hashes per worker & seconds to wait for a free slot
+    PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "4"))
+    PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", "10"))
+    # Storage target to handle file storage, one of "s3", "local" or "memory"
     STORAGE_TARGET = os.getenv("STORAGE_TARGET", "s3")
+    # Local target's root directory and the url files are served from, either
+    # the app's /files route or a web server serving the root directly. Only
+    # its public directory should be served directly, /files asks for an
+    # access token for other files
+    STORAGE_LOCAL_ROOT = os.getenv(
+        "STORAGE_LOCAL_ROOT", os.path.join(os.getcwd(), "uploads")
+    )
+    STORAGE_LOCAL_URL = os.getenv("STORAGE_LOCAL_URL", "/files")
+    # Internal nginx location mapped to the root, /files responds with an
+    # X-Accel-Redirect to it instead of reading files itself when set
+    STORAGE_LOCAL_ACCEL_REDIRECT = os.getenv("STORAGE_LOCAL_ACCEL_REDIRECT", None)
+    # Queue saves & deletes for the storage-worker command instead of running
+    # them within requests, uploads are staged to STORAGE_QUEUE_DIR meanwhile
+    STORAGE_QUEUE = os.getenv("STORAGE_QUEUE", "false").lower() == "true"
+    STORAGE_QUEUE_DIR = os.getenv(
+        "STORAGE_QUEUE_DIR", os.path.join(tempfile.gettempdir(), "storage_queue")
+    )
+    # Attempts per job, retry delays double from BACKOFF up to BACKOFF_MAX secs
+    STORAGE_QUEUE_MAX_ATTEMPTS = int(os.getenv("STORAGE_QUEUE_MAX_ATTEMPTS", "5"))
+    STORAGE_QUEUE_BACKOFF = float(os.getenv("STORAGE_QUEUE_BACKOFF", "5"))
+    STORAGE_QUEUE_BACKOFF_MAX = float(os.getenv("STORAGE_QUEUE_BACKOFF_MAX", "600"))
+    # Seconds a worker holds a job before others may pick it up again
+    STORAGE_QUEUE_LEASE = float(os.getenv("STORAGE_QUEUE_LEASE", "300"))
+    # Staged files no job references are removed by idle workers once older
+    # than this many seconds, e.g. those of rolled back requests
+    STORAGE_QUEUE_SWEEP_AGE = float(os.getenv("STORAGE_QUEUE_SWEEP_AGE", "3600"))
+    # Resized variants generated for uploaded avatars, as name:size pairs
+    IMAGE_VARIANTS = {
+        name: int(size)
+        for name, size in (
+            pair.split(":")
+            for pair in os.getenv("IMAGE_VARIANTS", "small:64,medium:256").split(",")
+            if pair
+        )
+    }
+    # Images with more pixels are rejected before being decoded for variants
+    IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(4096 * 4096)))
+    # Max size of uploaded files in bytes, requests are cut off a bit above it
+    MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(1024 ** 2)))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_SIZE + 64 * 1024
+
+    # Responses' JSON encoder, "orjson" falls back to "stdlib" when orjson
+    # isn't installed
+    JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson")
 
     # Sqlalchemy Configuration
     DATABASE_URL = os.getenv("DATABASE_URL")
@@ -36,7 +112,28 @@ class Config(object):
     SESSION_TYPE = "filesystem"
     SESSION_COOKIE_SECURE = True
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
-    SQLALCHEMY_ENGINE_OPTIONS = {"poolclass": NullPool}
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options()
+    # Read replicas' urls, comma separated, serving reads of GET, HEAD and
+    # OPTIONS requests. Clients read from the primary for the sticky seconds
+    # after writing, replicas failing to connect are retried after a while
+    SQLALCHEMY_REPLICAS = [
+        url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url
+    ]
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", "30"))
+
+    # Per-worker cache of authenticated sessions, a ttl of 0 disables it
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "30"))
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "1024"))
+    # Resolve identities through flask-principal's identity_changed signal and
+    # keep them in the session, otherwise they're set on g directly, only
+    # identity_loaded is sent and principal's session loader & saver are off
+    IDENTITY_SIGNALS = os.getenv("IDENTITY_SIGNALS", "false").lower() == "true"
+
+    # Seconds paginated lists' counts are cached when requested with count=cached
+    PAGINATION_COUNT_CACHE_TTL = int(os.getenv("PAGINATION_COUNT_CACHE_TTL", "30"))
+    # Rows fetched per round trip & sent per chunk by streamed exports
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
 
     # JWT Configurations
     JWT_SECRET_KEY = os.getenv(
@@ -58,6 +155,17 @@ class Config(object):
     AWS_SECRET_ACCESS_KEY = os.getenv("BUCKETEER_AWS_SECRET_ACCESS_KEY", None)
     S3_BUCKET_NAME = os.getenv("BUCKETEER_BUCKET_NAME", None)
     AWS_ENDPOINT = os.getenv("AWS_ENDPOINT", None)
+    # Shared S3 client's HTTP connection pool size & attempts per request
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "10"))
+    S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "3"))
+    # Uploads larger than the threshold are sent in parts of the chunk size
+    S3_MULTIPART_THRESHOLD = int(
+        os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 ** 2))
+    )
+    S3_MULTIPART_CHUNKSIZE = int(
+        os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 ** 2))
+    )
+    S3_MULTIPART_CONCURRENCY = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
 
 
 class DevConfig(Config):
@@ -0,0 +1,178 @@
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Set,
+)
+
+from flask.app import Flask
+
+from app.database import db
+
+if TYPE_CHECKING:
+    from app.apis.v1.users.models import User
+
+
+class TTLCache:
+    """Thread-safe bounded mapping whose entries expire after ``ttl`` seconds.
+
+    Once ``maxsize`` entries are stored the least recently used one is evicted.
+    A ``ttl`` or ``maxsize`` of ``0`` disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores value under key, ttl overrides the cache's default ttl"""
+        ttl = self.ttl if ttl is None else ttl
+        if not self.enabled or ttl <= 0:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.monotonic() + ttl, value)
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._remove(key)
+            return item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+class CachedIdentity(NamedTuple):
+    user: "User"
+    user_id: int
+    active: bool
+    roles: FrozenSet[str]
+
+
+class IdentityCache(TTLCache):
+    """Per-worker cache of resolved JWT sessions keyed by the token's jti.
+
+    Entries hold a detached snapshot of the user together with its active
+    flag and role names, so authenticated requests skip the session, user and
+    roles lookups. The cache lives in the worker's memory only, invalidation
+    in one worker does not reach the others and ``IDENTITY_CACHE_TTL`` bounds
+    how long they may serve a revoked session.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self._user_tokens: Dict[int, Set[Hashable]] = {}
+
+    def init_app(self, app: Flask) -> None:
+        self.maxsize = app.config["IDENTITY_CACHE_SIZE"]
+        self.ttl = app.config["IDENTITY_CACHE_TTL"]
+        self.clear()
+
+    def store(self, jti: str, user: "User") -> CachedIdentity:
+        """Caches a freshly loaded user under its session's jti
+
+        The user and its roles are expunged from the current session and kept
+        as a detached snapshot, use ``attach`` to get a session bound copy.
+
+        Args:
+            jti (str): session token's unique identifier
+            user (User): user instance loaded in the current session
+        """
+        roles = list(user.roles)
+        entry = CachedIdentity(
+            user=user,
+            user_id=user.id,
+            active=user.active,
+            roles=frozenset(role.name for role in roles),
+        )
+        if not self.enabled:
+            return entry
+        for role in roles:
+            db.session.expunge(role)
+        db.session.expunge(user)
+        with self._lock:
+            self.set(jti, entry)
+            self._user_tokens.setdefault(entry.user_id, set()).add(jti)
+        return entry
+
+    def attach(self, entry: CachedIdentity) -> "User":
+        """Returns the cached user bound to the current database session"""
+        if entry.user in db.session:
+            return entry.user
+        return db.session.merge(entry.user, load=False)
+
+    def invalidate(self, jti: Optional[str]) -> None:
+        """Drops a single session, e.g. on logout"""
+        self.pop(jti)
+
+    def invalidate_user(self, user_id: Optional[int]) -> None:
+        """Drops every cached session of a user, e.g. after updating it"""
+        with self._lock:
+            for jti in list(self._user_tokens.get(user_id, ())):
+                self.pop(jti)
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self._user_tokens.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry: CachedIdentity = self._data[key][1]
+        super()._remove(key)
+        tokens = self._user_tokens.get(entry.user_id)
+        if tokens is not None:
+            tokens.discard(key)
+            if not tokens:
+                del self._user_tokens[entry.user_id]
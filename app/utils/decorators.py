@@ -1,9 +1,12 @@
 from functools import wraps
-from typing import Callable, Iterable, List, Union
+from typing import Callable, FrozenSet, Iterable, List, Union
 
 from app.exceptions import InvalidUsage
 from flask import g
-from flask_principal import Identity, Permission, RoleNeed
+from flask_principal import Identity, Permission
+
+RoleExpression = Union[str, List["RoleExpression"]]
+RoleCheck = Callable[[FrozenSet[str]], bool]
 
 
 def check_roles(
@@ -23,21 +26,66 @@ def check_roles(
     return allowed_roles > 0 and (allowed_roles == len(roles) or optional)
 
 
-def has_roles(*args: Iterable[str]):
-    roles = [
-        (
-            Permission(RoleNeed(role))
-            if not isinstance(role, list)
-            else [Permission(RoleNeed(role_)) for role_ in role]
+def identity_roles(identity: Identity) -> FrozenSet[str]:
+    """Returns the names of the roles an identity provides
+
+    The jwt user loader sets them from the identity cache's entry, they're
+    collected from the identity's needs for identities loaded otherwise.
+    """
+    roles = getattr(identity, "roles", None)
+    if roles is None:
+        roles = frozenset(
+            need.value for need in identity.provides if need.method == "role"
         )
-        for role in args
-    ]
+    return roles
+
+
+def compile_roles(roles: Iterable[RoleExpression], any_of: bool = False) -> RoleCheck:
+    """Compiles a role expression into a predicate over a set of role names
+
+    Roles of a list are all required, the roles of a nested list are
+    alternatives to one another, and nesting alternates between the two.
+    An empty expression allows no one.
+    """
+    roles = list(roles)
+    names = frozenset(role for role in roles if not isinstance(role, list))
+    groups = tuple(
+        compile_roles(role, any_of=not any_of)
+        for role in roles
+        if isinstance(role, list)
+    )
+    if not roles:
+        return lambda provided: False
+    if any_of:
+        if not groups:
+            return lambda provided: not names.isdisjoint(provided)
+        return lambda provided: not names.isdisjoint(provided) or any(
+            group(provided) for group in groups
+        )
+    if not groups:
+        return names.issubset
+    return lambda provided: names.issubset(provided) and all(
+        group(provided) for group in groups
+    )
+
+
+def has_roles(*args: RoleExpression):
+    """Requires the current identity to provide roles
+
+    Example usage:
+
+        @has_roles("admin", ["editor", "reviewer"])
+        def fn():
+            # requires admin, and either editor or reviewer
+            pass
+    """
+    allows = compile_roles(args)
 
     def wrapper(fn: Callable):
         @wraps(fn)
         def wrapped(*args, **kwargs):
             identity: Identity = g.identity
-            if not check_roles(identity=identity, roles=roles):
+            if not allows(identity_roles(identity)):
                 raise InvalidUsage.user_not_authorized()
             return fn(*args, **kwargs)
 
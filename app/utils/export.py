@@ -0,0 +1,81 @@
+import csv
+import io
+from typing import Any, Callable, Dict, Iterator, List
+
+from flask import current_app, stream_with_context
+from flask.wrappers import Response
+from sqlalchemy.orm import Query
+
+from .json_encoding import dumps
+from .marshalling import row_marshaller
+
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _csv_value(value: Any) -> Any:
+    return dumps(value).decode() if isinstance(value, (list, dict)) else value
+
+
+def _ndjson_rows(rows: Iterator[Dict], columns: List[str]) -> Iterator[bytes]:
+    for row in rows:
+        yield dumps(row) + b"\n"
+
+
+def _csv_rows(rows: Iterator[Dict], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(row.get(column)) for column in columns])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+_encoders: Dict[str, Callable[[Iterator[Dict], List[str]], Iterator[bytes]]] = {
+    "ndjson": _ndjson_rows,
+    "csv": _csv_rows,
+}
+
+
+def stream_export(
+    query: Query, restx_model: Any, export_format: str, filename: str
+) -> Response:
+    """Streams query's rows marshalled with restx_model as NDJSON or CSV
+
+    Rows are fetched ``EXPORT_BATCH_SIZE`` at a time through a server side
+    cursor and sent in chunks of the same size, so memory use doesn't grow
+    with the number of exported rows. CSV columns are the model's keys,
+    lists and objects are JSON encoded in their cells.
+
+    Args:
+        query (Query): ordered query of the exported rows
+        restx_model (Model): model the rows are marshalled with
+        export_format (str): "ndjson" or "csv"
+        filename (str): downloaded file's name, without extension
+    """
+    batch_size = current_app.config["EXPORT_BATCH_SIZE"]
+    columns = list(getattr(restx_model, "resolved", restx_model))
+    encode = _encoders[export_format]
+
+    def generate() -> Iterator[bytes]:
+        marshal_row = row_marshaller(restx_model)
+        rows = (marshal_row(row) for row in query.yield_per(batch_size))
+        chunk = []
+        for index, line in enumerate(encode(rows, columns), 1):
+            chunk.append(line)
+            if index % batch_size == 0:
+                yield b"".join(chunk)
+                chunk.clear()
+        if chunk:
+            yield b"".join(chunk)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{filename}.{export_format}"'
+            )
+        },
+    )
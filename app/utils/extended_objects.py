@@ -1,21 +1,68 @@
 from functools import wraps
-from typing import Callable, List, Union
+from http import HTTPStatus
+from typing import Callable, List, Sequence, Union
 
 from flask_restx import Model, OrderedModel, fields
 from flask_restx.namespace import Namespace
+from flask_restx.utils import merge
+from sqlalchemy.orm import Query
 
 from app.database import BaseModel
 
-from .parsers import offset_parser
+from .marshalling import marshal_with
+from .pagination import (
+    count_rows,
+    encode_cursor,
+    keyset_paginate,
+    order_query,
+    parse_ordering,
+)
+from .parsers import cursor_parser
 
 
 class ExtendedNameSpace(Namespace):
+    def marshal_with(
+        self, fields, as_list=False, code=HTTPStatus.OK, description=None, **kwargs
+    ):
+        """Restx's marshal_with, marshalling responses with compiled fields"""
+
+        def wrapper(func: Callable):
+            doc = {
+                "responses": {
+                    str(code): (description, [fields], kwargs)
+                    if as_list
+                    else (description, fields, kwargs)
+                },
+                "__mask__": kwargs.get("mask", True),
+            }
+            func.__apidoc__ = merge(getattr(func, "__apidoc__", {}), doc)
+            return marshal_with(fields, ordered=self.ordered, **kwargs)(func)
+
+        return wrapper
+
     def serialize_multi(
         self,
         restx_model: Union[Model, OrderedModel],
         db_model: BaseModel,
         description="",
+        order_by: Sequence[str] = None,
     ):
+        """Marshals view's rows in a paginated envelope
+
+        The view may return a list of rows or a query which is then paginated
+        by offset, or by keyset when ``order_by`` is declared and the request
+        passes an ``after`` cursor. Returned queries are also counted, the
+        ``count`` argument picks an exact, cached or estimated count or skips
+        it, lists are counted against the whole table.
+
+        Args:
+            restx_model (Model): row's model
+            db_model (BaseModel): queried model
+            description (str, optional): response description
+            order_by (Sequence[str], optional): ordering attributes names,
+                prefixed with "-" for descending order.
+        """
+        ordering = parse_ordering(order_by) if order_by else None
         extended_model = self.model(
             f"{restx_model.name}s",
             {
@@ -23,6 +70,7 @@ class ExtendedNameSpace(Namespace):
                 "data": fields.Nested(restx_model, as_list=True),
                 "limit": fields.Integer(),
                 "offset": fields.Integer(),
+                "next": fields.String(description="Cursor of the next page"),
             },
         )
 
@@ -31,13 +79,34 @@ class ExtendedNameSpace(Namespace):
             @self.marshal_with(extended_model)
             @self.response(200, description, model=extended_model)
             def wrapped(*args, **kwargs):
-                args_ = offset_parser.parse_args()
-                result: List[BaseModel] = fn(*args, **kwargs)
+                args_ = cursor_parser.parse_args()
+                limit = args_.get("limit", 10) or 10
+                offset = args_.get("offset", 0) or 0
+                cursor = args_.get("after", None)
+                result: Union[Query, List[BaseModel]] = fn(*args, **kwargs)
+                next_cursor = None
+                count = count_rows(
+                    result if isinstance(result, Query) else db_model.query,
+                    args_.get("count") or "exact",
+                )
+
+                if isinstance(result, Query) and ordering and cursor is not None:
+                    offset = 0
+                    result = keyset_paginate(
+                        result, db_model, ordering, cursor, limit
+                    ).all()
+                    if len(result) == limit:
+                        next_cursor = encode_cursor(result[-1], ordering)
+                elif isinstance(result, Query):
+                    if ordering:
+                        result = order_query(result, db_model, ordering)
+                    result = result.offset(offset).limit(limit).all()
 
                 return {
-                    "count": db_model.query.count(),
-                    "limit": args_.get("limit", 10) or 10,
-                    "offset": args_.get("offset", 0) or 0,
+                    "count": count,
+                    "limit": limit,
+                    "offset": offset,
+                    "next": next_cursor,
                     "data": result,
                 }
 
@@ -0,0 +1,14 @@
+from .interface import (
+    IMAGE_CONTENT_TYPES,
+    FileStorageInterface,
+    UploadStream,
+    register_storage_handler,
+    sniff_content_type,
+    storage_handlers,
+)
+from .jobs import StorageJob, process_jobs
+from .local import FileStorageLocal
+from .memory import FileStorageMemory, memory_files
+from .s3 import FileStorageS3, s3_client
+from .storage import FileStorage
+from .views import files_bp
@@ -0,0 +1,164 @@
+import io
+import uuid
+from typing import Any, Callable, Dict, FrozenSet, Optional, Type, TypeVar
+
+from flask import abort
+from flask.wrappers import Response
+from werkzeug.utils import secure_filename
+
+from app.exceptions import InvalidUsage
+
+IMAGE_CONTENT_TYPES = frozenset(["image/png", "image/jpeg", "image/gif", "image/webp"])
+MAGIC_NUMBERS = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+# directory of public files, targets served by the /files route keep public
+# files apart as S3 marks them with a public-read ACL
+PUBLIC_DIRECTORY = "public"
+
+
+def sniff_content_type(head: bytes) -> str:
+    """Guesses a file's content type from its first bytes"""
+    for magic, content_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def is_public_key(file_key: str) -> bool:
+    """Whether a file key of the /files route is a public file's"""
+    parts = file_key.split("/")
+    return parts[0] == PUBLIC_DIRECTORY and ".." not in parts
+
+
+class UploadStream(io.IOBase):
+    """Read-only wrapper of an uploaded file's stream.
+
+    Reading more than ``max_size`` bytes raises, aborting the upload once the
+    limit is crossed instead of after the whole file is stored. The content
+    type is sniffed from the stream's first bytes only.
+    """
+
+    sniff_size = 32
+
+    def __init__(
+        self,
+        stream: io.BufferedIOBase,
+        max_size: int,
+        content_types: FrozenSet[str] = None,
+    ) -> None:
+        self._stream = stream
+        self.max_size = max_size
+        self.size = 0
+        self._head = self._read(self.sniff_size)
+        if not self._head:
+            raise InvalidUsage.empty_missing_file()
+        self.content_type = sniff_content_type(self._head)
+        if content_types is not None and self.content_type not in content_types:
+            raise InvalidUsage.unsupported_format()
+
+    def _read(self, size: int) -> bytes:
+        data = self._stream.read(size)
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise InvalidUsage.size_limit_exceeded(self.max_size)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        head, self._head = self._head, b""
+        if size is None or size < 0:
+            return head + self._read(-1)
+        if size <= len(head):
+            self._head = head[size:]
+            return head[:size]
+        chunks = [head]
+        remaining = size - len(head)
+        while remaining > 0:
+            chunk = self._read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+
+class FileStorageInterface:
+    data: io.BytesIO
+    name: str
+    public: bool
+    file_url: str
+    file_key: str
+    file_args: Dict[str, str]
+    file_object: Any
+
+    def __init__(
+        self, data: io.BytesIO, name: str, public: bool = False, url: str = None
+    ) -> None:
+        pass
+
+    def _get_fileobj_fromurl(self) -> None:
+        pass
+
+    def _create_fileobj(self) -> None:
+        pass
+
+    def _object_name(self) -> str:
+        """Hashed uploads' content key, or the file name with a random prefix"""
+        return getattr(self.data, "content_key", None) or "".join(
+            [uuid.uuid4().hex[:6], secure_filename(self.name or "")]
+        )
+
+    def _create_url(self, file_key: str) -> str:
+        pass
+
+    def save(
+        self,
+    ) -> None:
+        pass
+
+    def delete(
+        self,
+    ) -> None:
+        pass
+
+    def exists(self) -> bool:
+        """Checks if the file is already stored, to skip uploading it again"""
+        return False
+
+    def update(self, data: io.BytesIO, name: str, public: bool = False) -> None:
+        pass
+
+    @classmethod
+    def send(cls, file_key: str) -> Response:
+        """Serves a stored file, for targets without their own file server"""
+        abort(404)
+
+
+# storage handlers by their STORAGE_TARGET name
+storage_handlers: Dict[str, Type[FileStorageInterface]] = {}
+
+H = TypeVar("H", bound=Type[FileStorageInterface])
+
+
+def register_storage_handler(name: str) -> Callable[[H], H]:
+    """Registers a storage handler class to be selected by STORAGE_TARGET
+
+    Example usage:
+        @register_storage_handler("ftp")
+        class FileStorageFTP(FileStorageInterface):
+            ...
+    """
+
+    def decorator(handler: H) -> H:
+        storage_handlers[name] = handler
+        return handler
+
+    return decorator
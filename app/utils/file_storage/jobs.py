@@ -0,0 +1,311 @@
+import io
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.sql.expression import cast
+from sqlalchemy.sql.schema import Column, Index
+from sqlalchemy.sql.sqltypes import BOOLEAN, INTEGER, TIMESTAMP, String
+
+from app.database import BaseModel, db
+
+from .interface import FileStorageInterface, UploadStream, storage_handlers
+
+logger = logging.getLogger(__name__)
+
+
+class StorageJob(BaseModel):
+    """Queued file storage operation, processed by the ``storage-worker`` command.
+
+    Saves are staged to ``STORAGE_QUEUE_DIR`` and the job is committed with the
+    request's transaction. Workers lease due jobs by bumping their ``run_at``,
+    failed jobs are retried with an exponential backoff. Jobs are keyed by
+    their operation and url, queuing a pending operation again is a no-op.
+    """
+
+    __tablename__ = "storage_jobs"
+
+    key = Column(String, nullable=False, unique=True, comment="Idempotency key")
+    operation = Column(String, nullable=False, comment="save or delete")
+    target = Column(String, nullable=False, comment="Storage target's name")
+    url = Column(String, nullable=False, comment="Stored file's url")
+    name = Column(String, nullable=True, comment="Uploaded file's name")
+    public = Column(BOOLEAN, nullable=False, server_default=cast(0, BOOLEAN))
+    staged_path = Column(String, nullable=True, comment="Staged file's local path")
+    status = Column(
+        String, nullable=False, comment="pending, done, failed or cancelled"
+    )
+    attempts = Column(INTEGER, nullable=False, comment="Attempts count")
+    run_at = Column(TIMESTAMP(True), nullable=False, comment="Next attempt's date")
+    last_error = Column(String, nullable=True, comment="Last attempt's error")
+    created_at = Column(TIMESTAMP(True), nullable=False, comment="Queuing date")
+
+    __table_args__ = (Index("ix_storage_jobs_status_run_at", "status", "run_at"),)
+
+    def __init__(
+        self,
+        operation: str,
+        target: str,
+        url: str,
+        name: str = None,
+        public: bool = False,
+        staged_path: str = None,
+    ) -> None:
+        self.key = f"{operation}:{url}"
+        self.operation = operation
+        self.url = url
+        self.queue(target, name, public, staged_path)
+
+    def queue(
+        self,
+        target: str,
+        name: str = None,
+        public: bool = False,
+        staged_path: str = None,
+    ) -> None:
+        """(Re)sets the job as pending and due now"""
+        now = datetime.now(tz=current_app.config["TZ"])
+        if self.staged_path != staged_path:
+            remove_staged(self.staged_path)
+        self.target = target
+        self.name = name
+        self.public = public
+        self.staged_path = staged_path
+        self.status = "pending"
+        self.attempts = 0
+        self.last_error = None
+        self.run_at = now
+        self.created_at = now
+
+    @classmethod
+    def enqueue(
+        cls,
+        operation: str,
+        target: str,
+        url: str,
+        data: io.IOBase = None,
+        name: str = None,
+        public: bool = False,
+    ) -> "StorageJob":
+        """Adds a job to the current transaction, unless one is already pending
+
+        Content addressed files may be stored again after being deleted, so
+        finished jobs of the same key are queued again. Saving a file cancels
+        its pending delete, the save is then queued again to run after any
+        delete a worker already started.
+
+        Args:
+            operation (str): "save" or "delete"
+            target (str): storage target's name
+            url (str): url of the file to save or delete
+            data (io.IOBase): content of the file to save, staged locally
+            name (str): name of the file to save
+            public (bool): whether the file to save is public
+        """
+        key = f"{operation}:{url}"
+        superseded = (
+            operation == "save"
+            and db.session.execute(
+                update(cls.__table__)
+                .where(cls.key == f"delete:{url}", cls.status == "pending")
+                .values(status="cancelled")
+            ).rowcount
+        )
+        job = cls.query.filter(cls.key == key).one_or_none()
+        if job is not None and job.status == "pending" and not superseded:
+            return job
+        staged_path = stage_upload(data) if data is not None else None
+        if job is None:
+            job = cls(operation, target, url, name, public, staged_path)
+            db.session.add(job)
+        else:
+            job.queue(target, name, public, staged_path)
+        return job
+
+    @classmethod
+    def enqueue_save(cls, handler: FileStorageInterface, target: str) -> "StorageJob":
+        """Queues the upload of handler's data"""
+        handler._create_url(handler.file_key)
+        return cls.enqueue(
+            "save",
+            target,
+            handler.file_url,
+            data=handler.data,
+            name=handler.name,
+            public=handler.public,
+        )
+
+    @classmethod
+    def enqueue_delete(cls, url: str, target: str) -> "StorageJob":
+        return cls.enqueue("delete", target, url)
+
+    def handler(self, data: Optional[UploadStream] = None) -> FileStorageInterface:
+        return storage_handlers[self.target](data, self.name, self.public, self.url)
+
+    def run(self) -> None:
+        if self.operation == "save":
+            with open(self.staged_path, "rb") as fp:
+                size = os.fstat(fp.fileno()).st_size
+                self.handler(UploadStream(fp, size)).save()
+        elif self.operation == "delete":
+            # a pending upload of the file is dropped, one that's running is
+            # reverted by its worker once it finds out it was cancelled
+            save = StorageJob.query.filter(
+                StorageJob.key == f"save:{self.url}"
+            ).one_or_none()
+            if save is not None and save.created_at > self.created_at:
+                # stored again since, this delete was cancelled meanwhile
+                return
+            cancelled = (
+                save is not None
+                and db.session.execute(
+                    update(StorageJob.__table__)
+                    .where(
+                        StorageJob.id == save.id,
+                        StorageJob.status == "pending",
+                        StorageJob.created_at <= self.created_at,
+                    )
+                    .values(status="cancelled")
+                ).rowcount
+            )
+            if cancelled:
+                remove_staged(save.staged_path)
+            self.handler().delete()
+        else:
+            raise ValueError(f"Unknown storage operation {self.operation}")
+
+    def retry_later(self, error: Exception) -> None:
+        config = current_app.config
+        self.last_error = repr(error)
+        if self.attempts >= config["STORAGE_QUEUE_MAX_ATTEMPTS"]:
+            self.status = "failed"
+            remove_staged(self.staged_path)
+            self.staged_path = None
+            return
+        delay = min(
+            config["STORAGE_QUEUE_BACKOFF"] * 2 ** (self.attempts - 1),
+            config["STORAGE_QUEUE_BACKOFF_MAX"],
+        )
+        self.run_at = datetime.now(tz=config["TZ"]) + timedelta(seconds=delay)
+
+
+def stage_upload(data: io.IOBase) -> str:
+    """Copies an upload's data to the staging directory and returns its path"""
+    directory = current_app.config["STORAGE_QUEUE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, uuid.uuid4().hex)
+    try:
+        with open(path, "wb") as fp:
+            shutil.copyfileobj(data, fp, 64 * 1024)
+    except BaseException:
+        remove_staged(path)
+        raise
+    return path
+
+
+def remove_staged(path: Optional[str]) -> None:
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+
+def sweep_staged() -> List[str]:
+    """Removes staged files no job references and returns their paths
+
+    Files of requests rolled back after staging their uploads aren't
+    referenced by any job. Only files older than ``STORAGE_QUEUE_SWEEP_AGE``
+    seconds are removed, so uploads of requests still running are kept.
+    """
+    config = current_app.config
+    directory = config["STORAGE_QUEUE_DIR"]
+    if not os.path.isdir(directory):
+        return []
+    referenced = {
+        path
+        for path, in db.session.query(StorageJob.staged_path).filter(
+            StorageJob.staged_path.isnot(None)
+        )
+    }
+    db.session.commit()
+    oldest = time.time() - config["STORAGE_QUEUE_SWEEP_AGE"]
+    removed = []
+    for entry in os.scandir(directory):
+        if (
+            entry.is_file()
+            and entry.path not in referenced
+            and entry.stat().st_mtime < oldest
+        ):
+            remove_staged(entry.path)
+            removed.append(entry.path)
+    return removed
+
+
+def claim_jobs(limit: int) -> List[StorageJob]:
+    """Leases up to limit due jobs for ``STORAGE_QUEUE_LEASE`` seconds
+
+    A job is claimed by bumping its attempts count, which fails if another
+    worker claimed it first. Jobs of crashed workers are due again once their
+    lease expires.
+    """
+    config = current_app.config
+    now = datetime.now(tz=config["TZ"])
+    due = (
+        db.session.query(StorageJob.id, StorageJob.attempts)
+        .filter(StorageJob.status == "pending", StorageJob.run_at <= now)
+        .order_by(StorageJob.id)
+        .limit(limit)
+        .all()
+    )
+    claimed = []
+    for id, attempts in due:
+        result = db.session.execute(
+            update(StorageJob.__table__)
+            .where(
+                StorageJob.id == id,
+                StorageJob.status == "pending",
+                StorageJob.attempts == attempts,
+            )
+            .values(
+                attempts=attempts + 1,
+                run_at=now + timedelta(seconds=config["STORAGE_QUEUE_LEASE"]),
+            )
+        )
+        if result.rowcount == 1:
+            claimed.append(id)
+    db.session.commit()
+    if not claimed:
+        return []
+    return (
+        StorageJob.query.filter(StorageJob.id.in_(claimed))
+        .order_by(StorageJob.id)
+        .all()
+    )
+
+
+def process_jobs(limit: int = 10) -> int:
+    """Runs due storage jobs and returns how many were processed"""
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        try:
+            job.run()
+        except Exception as e:
+            logger.warning("Storage job %s failed: %r", job.key, e)
+            job.retry_later(e)
+            db.session.commit()
+            continue
+        done = db.session.execute(
+            update(StorageJob.__table__)
+            .where(StorageJob.id == job.id, StorageJob.status == "pending")
+            .values(status="done", last_error=None)
+        )
+        db.session.commit()
+        if job.operation == "save":
+            remove_staged(job.staged_path)
+            if done.rowcount == 0:
+                job.handler().delete()
+    return len(jobs)
@@ -0,0 +1,125 @@
+import io
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from flask import abort, current_app, send_from_directory
+from flask.wrappers import Response
+from werkzeug.security import safe_join
+
+from .interface import PUBLIC_DIRECTORY, FileStorageInterface, register_storage_handler
+
+
+@register_storage_handler("local")
+class FileStorageLocal(FileStorageInterface):
+    """Stores files under ``STORAGE_LOCAL_ROOT``.
+
+    Files are sharded in two levels of directories named after their key's
+    first characters, and written to a temporary file renamed in place once
+    complete, so readers never see partial files. Public files are kept in
+    the root's ``public`` directory. The root may be served by the app's
+    /files route, which asks for an access token for other files, and the
+    public directory directly by a web server.
+    """
+
+    file_key: str
+
+    def __init__(
+        self, data: io.BytesIO, name: str, public: bool = False, url: str = None
+    ) -> None:
+        self.data = data
+        self.name = name
+        self.public = public
+        self.file_args = {}
+
+        if url:
+            self.file_url = url
+            self.file_key = self._get_fileobj_fromurl()
+        elif data:
+            self.file_key = self._create_fileobj()
+
+    def __repr__(self) -> str:
+        return self.file_url
+
+    @staticmethod
+    def file_path(file_key: str) -> str:
+        path = safe_join(current_app.config["STORAGE_LOCAL_ROOT"], file_key)
+        if path is None:
+            raise ValueError(f"Invalid file key {file_key}")
+        return path
+
+    def _get_fileobj_fromurl(
+        self,
+    ) -> str:
+        parts = self.file_url.split("/")
+        depth = 4 if parts[-4:-3] == [PUBLIC_DIRECTORY] else 3
+        return "/".join(parts[-depth:])
+
+    def _create_fileobj(self) -> str:
+        name = self._object_name()
+        shards = [PUBLIC_DIRECTORY] if self.public else []
+        return "/".join([*shards, name[:2], name[2:4], name])
+
+    def _create_url(self, file_key: str) -> None:
+        base_url = current_app.config["STORAGE_LOCAL_URL"].rstrip("/")
+        self.file_url = f"{base_url}/{file_key}"
+
+    def save(
+        self,
+    ) -> None:
+        path = self.file_path(self.file_key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                shutil.copyfileobj(self.data, fp, 64 * 1024)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self._create_url(self.file_key)
+
+    def delete(self) -> bool:
+        try:
+            os.unlink(self.file_path(self.file_key))
+            return True
+        except (FileNotFoundError, ValueError):
+            return False
+
+    def exists(self) -> bool:
+        return os.path.exists(self.file_path(self.file_key))
+
+    def update(self, data: io.BytesIO, name: str, public: bool = False) -> None:
+        self.delete()
+        self.data = data
+        self.name = name
+        self.public = public
+        self.file_key = self._create_fileobj()
+        self.save()
+
+    @classmethod
+    def send(cls, file_key: str) -> Response:
+        """Serves a stored file, through nginx when it's configured
+
+        Without STORAGE_LOCAL_ACCEL_REDIRECT, files are streamed through the
+        WSGI server's file wrapper, which uses sendfile where it's supported.
+        """
+        config = current_app.config
+        if config["STORAGE_LOCAL_ACCEL_REDIRECT"]:
+            if safe_join(config["STORAGE_LOCAL_ROOT"], file_key) is None:
+                abort(404)
+            response = Response(
+                mimetype=mimetypes.guess_type(file_key)[0] or "application/octet-stream"
+            )
+            location = config["STORAGE_LOCAL_ACCEL_REDIRECT"].rstrip("/")
+            response.headers["X-Accel-Redirect"] = f"{location}/{file_key}"
+            return response
+        return send_from_directory(
+            config["STORAGE_LOCAL_ROOT"], file_key, conditional=True
+        )
@@ -0,0 +1,91 @@
+import io
+from threading import Lock
+from typing import Dict, Tuple
+
+from flask import abort, current_app
+from flask.wrappers import Response
+
+from .interface import PUBLIC_DIRECTORY, FileStorageInterface, register_storage_handler
+
+# stored files' content and content type by their keys
+memory_files: Dict[str, Tuple[bytes, str]] = {}
+_memory_files_lock = Lock()
+
+
+@register_storage_handler("memory")
+class FileStorageMemory(FileStorageInterface):
+    """Keeps files in the worker's memory, served by the app's /files route.
+
+    Meant for tests and offline benchmarks, files are lost on restart and
+    aren't shared between workers.
+    """
+
+    file_key: str
+
+    def __init__(
+        self, data: io.BytesIO, name: str, public: bool = False, url: str = None
+    ) -> None:
+        self.data = data
+        self.name = name
+        self.public = public
+        self.file_args = {}
+
+        if url:
+            self.file_url = url
+            self.file_key = self._get_fileobj_fromurl()
+        elif data:
+            self.file_key = self._create_fileobj()
+
+    def __repr__(self) -> str:
+        return self.file_url
+
+    def _get_fileobj_fromurl(
+        self,
+    ) -> str:
+        parts = self.file_url.split("/")
+        depth = 2 if parts[-2:-1] == [PUBLIC_DIRECTORY] else 1
+        return "/".join(parts[-depth:])
+
+    def _create_fileobj(self) -> str:
+        name = self._object_name()
+        return f"{PUBLIC_DIRECTORY}/{name}" if self.public else name
+
+    def _create_url(self, file_key: str) -> None:
+        base_url = current_app.config["STORAGE_LOCAL_URL"].rstrip("/")
+        self.file_url = f"{base_url}/{file_key}"
+
+    def save(
+        self,
+    ) -> None:
+        content_type = getattr(self.data, "content_type", None)
+        content = self.data.read()
+        with _memory_files_lock:
+            memory_files[self.file_key] = (
+                content,
+                content_type or "application/octet-stream",
+            )
+
+        self._create_url(self.file_key)
+
+    def delete(self) -> bool:
+        with _memory_files_lock:
+            return memory_files.pop(self.file_key, None) is not None
+
+    def exists(self) -> bool:
+        return self.file_key in memory_files
+
+    def update(self, data: io.BytesIO, name: str, public: bool = False) -> None:
+        self.delete()
+        self.data = data
+        self.name = name
+        self.public = public
+        self.file_key = self._create_fileobj()
+        self.save()
+
+    @classmethod
+    def send(cls, file_key: str) -> Response:
+        stored = memory_files.get(file_key)
+        if stored is None:
+            abort(404)
+        content, content_type = stored
+        return Response(content, mimetype=content_type)
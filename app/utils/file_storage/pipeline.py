@@ -0,0 +1,130 @@
+import hashlib
+import io
+import re
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+from PIL import Image, ImageOps
+
+from app.exceptions import InvalidUsage
+
+from .interface import UploadStream
+
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+CONTENT_KEY = re.compile(r"^(?P<digest>[0-9a-f]{64})(?P<extension>\.\w+)$")
+
+
+class HashedUpload(io.IOBase):
+    """Upload spooled to a temporary file while hashing its content.
+
+    Its ``content_key`` names it after its sha256 digest, so handlers store
+    identical uploads under the same key once.
+    """
+
+    spool_size = 1024 ** 2
+
+    def __init__(self, data: UploadStream) -> None:
+        self.content_type = data.content_type
+        self._file = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: data.read(64 * 1024), b""):
+            digest.update(chunk)
+            self._file.write(chunk)
+        self.size = self._file.tell()
+        self._file.seek(0)
+        self.digest = digest.hexdigest()
+        self.content_key = content_key(self.digest, self.content_type)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        return self._file.read(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class VariantUpload(io.BytesIO):
+    """Resized image generated from an upload"""
+
+    def __init__(self, content_type: str, content_key: str) -> None:
+        super().__init__()
+        self.content_type = content_type
+        self.content_key = content_key
+
+
+def content_key(digest: str, content_type: str, variant: str = None) -> str:
+    name = digest if variant is None else f"{digest}-{variant}"
+    return f"{name}{EXTENSIONS.get(content_type, '')}"
+
+
+def image_variants(
+    upload: HashedUpload, sizes: Dict[str, int], max_pixels: int
+) -> List[VariantUpload]:
+    """Resizes an uploaded image to fit in each of the sizes' squares
+
+    Variants keep the image's format and are keyed after the original's digest.
+    Images of more than max_pixels are rejected before being decoded, others
+    are decoded once at the largest size, JPEGs straight at a reduced scale,
+    and the smaller variants resized from it.
+    """
+    upload.seek(0)
+    variants = []
+    if not sizes:
+        return variants
+    largest = max(sizes.values())
+    try:
+        with Image.open(upload) as image:
+            width, height = image.size
+            if width * height > max_pixels:
+                raise InvalidUsage.custom_error(
+                    f"Image is larger than {max_pixels} pixels", code=400
+                )
+            image_format = image.format
+            if image_format == "JPEG":
+                image.draft(image.mode, (largest, largest))
+            image.thumbnail((largest, largest))
+            image = ImageOps.exif_transpose(image)
+            for name, size in sizes.items():
+                variant = VariantUpload(
+                    upload.content_type,
+                    content_key(upload.digest, upload.content_type, name),
+                )
+                resized = image.copy()
+                resized.thumbnail((size, size))
+                resized.save(variant, format=image_format)
+                variant.seek(0)
+                variants.append(variant)
+    except (OSError, Image.DecompressionBombError):
+        raise InvalidUsage.unsupported_format()
+    finally:
+        upload.seek(0)
+    return variants
+
+
+def variant_urls(url: Optional[str], names: Iterable[str]) -> Optional[Dict[str, str]]:
+    """Returns urls of a content addressed image's variants, None for others"""
+    if not url:
+        return None
+    base_url, _, name = url.rpartition("/")
+    match = CONTENT_KEY.match(name)
+    if match is None or match.group("extension") not in EXTENSIONS.values():
+        return None
+    digest, extension = match.group("digest"), match.group("extension")
+    return {variant: f"{base_url}/{digest}-{variant}{extension}" for variant in names}
@@ -0,0 +1,145 @@
+import io
+import os
+from threading import Lock
+from typing import Any, Dict, Tuple
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from flask import current_app
+
+from .interface import FileStorageInterface, register_storage_handler
+
+_s3_clients: Dict[Tuple, Any] = {}
+_s3_clients_pid = os.getpid()
+_s3_clients_lock = Lock()
+
+
+def s3_client() -> Any:
+    """Returns the process wide S3 client for the current app's settings.
+
+    Clients are thread-safe and keep a pool of HTTP connections, they're
+    created on first use and recreated in forked workers.
+    """
+    global _s3_clients_pid
+    config = current_app.config
+    protocol = "https" if config["FLASK_ENV"] == "production" else "http"
+    settings = (
+        f"{protocol}://{config['AWS_ENDPOINT']}" if config["AWS_ENDPOINT"] else None,
+        config["AWS_REGION"],
+        config["AWS_ACCESS_KEY_ID"],
+        config["AWS_SECRET_ACCESS_KEY"],
+        config["S3_MAX_POOL_CONNECTIONS"],
+        config["S3_MAX_ATTEMPTS"],
+    )
+    with _s3_clients_lock:
+        if _s3_clients_pid != os.getpid():
+            _s3_clients.clear()
+            _s3_clients_pid = os.getpid()
+        client = _s3_clients.get(settings)
+        if client is None:
+            endpoint_url, region, key_id, secret, pool_size, attempts = settings
+            client = boto3.session.Session().client(
+                "s3",
+                endpoint_url=endpoint_url,
+                region_name=region,
+                aws_access_key_id=key_id,
+                aws_secret_access_key=secret,
+                config=Config(
+                    max_pool_connections=pool_size,
+                    retries={"max_attempts": attempts, "mode": "standard"},
+                ),
+            )
+            _s3_clients[settings] = client
+        return client
+
+
+@register_storage_handler("s3")
+class FileStorageS3(FileStorageInterface):
+    file_key: str
+
+    def __init__(
+        self, data: io.BytesIO, name: str, public: bool = False, url: str = None
+    ) -> None:
+        self.data = data
+        self.name = name
+        self.public = public
+        self.file_args = {} if not public else {"ACL": "public-read"}
+
+        if url:
+            self.file_url = url
+            self.file_key = self._get_fileobj_fromurl()
+        elif data:
+            self.file_key = self._create_fileobj()
+
+    def __repr__(self) -> str:
+        return self.file_url
+
+    def _get_fileobj_fromurl(
+        self,
+    ) -> str:
+        return self.file_url.split("/")[-1]
+
+    def _create_fileobj(self) -> str:
+        return self._object_name()
+
+    def _create_url(self, file_key: str) -> None:
+        protocol = (
+            "https" if current_app.config["FLASK_ENV"] == "production" else "http"
+        )
+
+        self.file_url = f"{protocol}://s3-{current_app.config['AWS_REGION']}.{current_app.config['AWS_ENDPOINT']}/{current_app.config['S3_BUCKET_NAME']}/{file_key}"
+
+    def save(
+        self,
+    ) -> str:
+
+        config = current_app.config
+        extra_args = dict(self.file_args)
+        content_type = getattr(self.data, "content_type", None)
+        if content_type:
+            extra_args["ContentType"] = content_type
+        s3_client().upload_fileobj(
+            self.data,
+            config["S3_BUCKET_NAME"],
+            self.file_key,
+            ExtraArgs=extra_args,
+            Config=TransferConfig(
+                multipart_threshold=config["S3_MULTIPART_THRESHOLD"],
+                multipart_chunksize=config["S3_MULTIPART_CHUNKSIZE"],
+                max_concurrency=config["S3_MULTIPART_CONCURRENCY"],
+                use_threads=config["S3_MULTIPART_CONCURRENCY"] > 1,
+            ),
+        )
+
+        self._create_url(self.file_key)
+
+    def delete(self):
+
+        bucket = current_app.config["S3_BUCKET_NAME"]
+        try:
+            head = s3_client().head_object(Bucket=bucket, Key=self.file_key)
+            if head["ContentLength"] > 0:
+                s3_client().delete_object(Bucket=bucket, Key=self.file_key)
+            return True
+        except ClientError:
+            return False
+
+    def exists(self) -> bool:
+        try:
+            s3_client().head_object(
+                Bucket=current_app.config["S3_BUCKET_NAME"], Key=self.file_key
+            )
+            return True
+        except ClientError:
+            return False
+
+    def update(self, data: io.BytesIO, name: str, public: bool = False) -> None:
+        self.delete()
+        self.data = data
+        self.name = name
+        self.public = public
+        self.file_args = {} if not public else {"ACL": "public-read"}
+        self.file_key = self._create_fileobj()
+        self.save()
@@ -0,0 +1,143 @@
+import io
+from typing import Dict, FrozenSet, List, Optional
+
+from flask import current_app
+
+from .interface import (
+    IMAGE_CONTENT_TYPES,
+    FileStorageInterface,
+    UploadStream,
+    storage_handlers,
+)
+from .jobs import StorageJob
+from .pipeline import HashedUpload, image_variants, variant_urls
+
+
+class FileStorage:
+    """Storage target agnostic file wrapper.
+
+    The storage handler, and any remote object it refers to, is only created
+    once an operation needs it, reading ``url`` of a stored file is free.
+    Uploaded data is read through an ``UploadStream`` limited to
+    ``MAX_UPLOAD_SIZE`` bytes and, when given, to ``content_types``, then
+    hashed and stored under a content addressed key. Files already stored
+    aren't uploaded again. With ``variants`` images are also resized to the
+    ``IMAGE_VARIANTS`` sizes.
+
+    With ``STORAGE_QUEUE`` enabled saves and deletes are queued as
+    ``StorageJob`` rows and run later by the ``storage-worker`` command.
+    """
+
+    _handler: Optional[FileStorageInterface]
+    url: str
+
+    def __init__(
+        self,
+        data: io.BytesIO = None,
+        name: str = None,
+        public: bool = False,
+        url: str = None,
+        content_types: FrozenSet[str] = None,
+        variants: bool = False,
+    ) -> None:
+
+        if data is not None and not isinstance(data, UploadStream):
+            data = UploadStream(
+                data, current_app.config["MAX_UPLOAD_SIZE"], content_types
+            )
+        if data is not None:
+            data = HashedUpload(data)
+        self._variants = variants
+        self._handler = None
+        self._args = (data, name, public, url)
+        self._url = url
+
+    @property
+    def handler(self) -> FileStorageInterface:
+        if self._handler is None:
+            self._handler = storage_handlers[current_app.config["STORAGE_TARGET"]](
+                *self._args
+            )
+        return self._handler
+
+    def __repr__(self) -> str:
+        return repr(self.url)
+
+    def _get_fileobj_fromurl(self) -> None:
+        self.handler._get_fileobj_fromurl()
+
+    def _create_fileobj(self) -> None:
+        self.handler._create_fileobj()
+
+    def _variant_handlers(self) -> List[FileStorageInterface]:
+        data, name, public, _ = self._args
+        if (
+            not self._variants
+            or data is None
+            or data.content_type not in IMAGE_CONTENT_TYPES
+        ):
+            return []
+        handler_class = storage_handlers[current_app.config["STORAGE_TARGET"]]
+        return [
+            handler_class(variant, name, public)
+            for variant in image_variants(
+                data,
+                current_app.config["IMAGE_VARIANTS"],
+                current_app.config["IMAGE_MAX_PIXELS"],
+            )
+        ]
+
+    def save(
+        self,
+    ) -> None:
+        target = current_app.config["STORAGE_TARGET"]
+        for handler in [*self._variant_handlers(), self.handler]:
+            if current_app.config["STORAGE_QUEUE"]:
+                StorageJob.enqueue_save(handler, target)
+            elif handler.exists():
+                handler._create_url(handler.file_key)
+            else:
+                handler.save()
+
+    @property
+    def url(self) -> Optional[str]:
+        if self._handler is None:
+            return self._url
+        return getattr(self._handler, "file_url", None)
+
+    @url.getter
+    def get_url(self):
+        return self.url
+
+    @property
+    def variants(self) -> Optional[Dict[str, str]]:
+        """Urls of a content addressed image's IMAGE_VARIANTS"""
+        return variant_urls(self.url, current_app.config["IMAGE_VARIANTS"])
+
+    def delete(
+        self,
+    ) -> bool:
+        if self._handler is None and not self._url:
+            return False
+        target = current_app.config["STORAGE_TARGET"]
+        variants = list((self.variants or {}).values())
+        if current_app.config["STORAGE_QUEUE"]:
+            for url in [*variants, self.url]:
+                StorageJob.enqueue_delete(url, target)
+            return True
+        for url in variants:
+            storage_handlers[target](None, None, url=url).delete()
+        return self.handler.delete()
+
+    def update(self, data: io.BytesIO, name: str, public: bool = False) -> None:
+        if not isinstance(data, UploadStream):
+            data = UploadStream(data, current_app.config["MAX_UPLOAD_SIZE"])
+        data = HashedUpload(data)
+        if current_app.config["STORAGE_QUEUE"]:
+            self.delete()
+            self._handler = None
+            self._args = (data, name, public, None)
+            self._url = None
+            self.save()
+        else:
+            self.handler.update(data=data, name=name, public=public)
@@ -0,0 +1,19 @@
+from flask import Blueprint, current_app
+from flask.wrappers import Response
+from flask_jwt_extended import verify_jwt_in_request
+
+from .interface import is_public_key, storage_handlers
+
+files_bp = Blueprint("files", __name__, url_prefix="/files")
+
+
+@files_bp.route("/<path:file_key>")
+def send_file(file_key: str) -> Response:
+    """Serves files of storage targets without their own file server
+
+    Files that weren't stored as public need an access token, as private S3
+    objects need credentials.
+    """
+    if not is_public_key(file_key):
+        verify_jwt_in_request()
+    return storage_handlers[current_app.config["STORAGE_TARGET"]].send(file_key)
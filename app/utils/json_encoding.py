@@ -0,0 +1,67 @@
+import dataclasses
+import json
+import uuid
+from datetime import date, time
+from typing import Any, Dict
+
+from flask import current_app
+from flask.json import JSONEncoder as FlaskJSONEncoder
+from flask.wrappers import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def json_default(value: Any) -> Any:
+    """Encodes values json doesn't support, dates as restx's DateTime does"""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """Flask's encoder with iso formatted dates, used by jsonify"""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def use_orjson() -> bool:
+    """Whether orjson encodes responses, as set by ``JSON_ENCODER``"""
+    return orjson is not None and current_app.config["JSON_ENCODER"] != "stdlib"
+
+
+def dumps(data: Any) -> bytes:
+    """Encodes data with the configured encoder, indented in debug mode
+
+    ``RESTX_JSON`` settings are passed to the stdlib encoder, they aren't
+    supported by orjson.
+    """
+    settings: Dict[str, Any] = current_app.config.get("RESTX_JSON", {})
+    if use_orjson() and not settings:
+        option = orjson.OPT_NON_STR_KEYS
+        if current_app.debug:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=json_default, option=option)
+    settings = {"default": json_default, **settings}
+    if current_app.debug:
+        settings.setdefault("indent", 4)
+    return json.dumps(data, **settings).encode()
+
+
+def json_response(data: Any, code: int = 200, headers: Dict = None) -> Response:
+    """Makes a response with a JSON encoded body, also registered as restx's
+    application/json representation"""
+    response = Response(dumps(data) + b"\n", code, mimetype="application/json")
+    response.headers.extend(headers or {})
+    return response
@@ -0,0 +1,398 @@
+from datetime import datetime
+from functools import partial, wraps
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import urlencode, urlparse, urlunparse
+
+from flask import current_app, has_app_context, request
+from flask.globals import _request_ctx_stack
+from flask_restx import fields
+from flask_restx import marshal as restx_marshal
+from flask_restx.fields import get_value
+from flask_restx.inputs import boolean
+from flask_restx.marshalling import marshal_with as restx_marshal_with
+from flask_restx.utils import unpack
+
+from .url_w_args import UrlWArgs
+
+Getter = Callable[[Any], Any]
+# called once per marshalled response, returns the field's per row getter
+Binder = Callable[[], Getter]
+
+
+class IsCurrent(fields.Boolean):
+    """Whether a row's attribute equals a value of the current request
+
+    ``current`` is called once per marshalled response by compiled
+    serializers instead of once per row.
+    """
+
+    def __init__(self, current: Callable[[], Any], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.current = current
+
+    def output(self, key, obj, **kwargs):
+        value = get_value(key if self.attribute is None else self.attribute, obj)
+        return value == self.current()
+
+
+class _NotCompilable(Exception):
+    pass
+
+
+class CompiledFields:
+    """Restx fields compiled into a flat function building a row's dict.
+
+    Fields' getters are bound once per response, hoisting per request values
+    such as url adapters, and the row function is generated with a dict
+    literal of the fields' keys.
+    """
+
+    def __init__(self, binders: Dict[str, Binder], skip_none: bool = False) -> None:
+        self.binders = binders
+        self.skip_none = skip_none
+        names = [f"_{index}" for index in range(len(binders))]
+        items = ", ".join(f"{key!r}: {name}(obj)" for key, name in zip(binders, names))
+        body = f"{{{items}}}"
+        if skip_none:
+            body = (
+                f"{{key: value for key, value in {body}.items()"
+                " if value is not None and value != {}}"
+            )
+        source = (
+            f"def make({', '.join(names)}):\n"
+            "    def row(obj):\n"
+            "        if isinstance(obj, (list, tuple)):\n"
+            "            return [row(item) for item in obj]\n"
+            f"        return {body}\n"
+            "    return row\n"
+        )
+        namespace: Dict[str, Any] = {}
+        exec(compile(source, "<compiled fields>", "exec"), namespace)
+        self._make = namespace["make"]
+
+    def bind(self) -> Getter:
+        return self._make(*[bind() for bind in self.binders.values()])
+
+    def __call__(self, data: Any) -> Any:
+        return self.bind()(data)
+
+
+_compiled: Dict[Tuple[int, bool], Tuple[Any, Optional[CompiledFields]]] = {}
+_compiled_lock = Lock()
+_plain_types: Dict[type, bool] = {}
+
+
+def _plain(obj: Any) -> bool:
+    """Whether restx resolves obj's keys with getattr only, memoized by type
+
+    Strings and objects which aren't iterable or can't be subscripted fail
+    restx's item lookups.
+    """
+    kind = type(obj)
+    plain = _plain_types.get(kind)
+    if plain is None:
+        plain = _plain_types[kind] = (
+            hasattr(obj, "strip")
+            or not hasattr(obj, "__iter__")
+            or not hasattr(kind, "__getitem__")
+        )
+    return plain
+
+
+def attribute_getter(key: Hashable) -> Getter:
+    """Returns a getter resolving key like restx's get_value"""
+    if callable(key):
+        return key
+    if not isinstance(key, str):
+        return partial(get_value, key)
+    if "." in key:
+        getters = [attribute_getter(key_) for key_ in key.split(".")]
+
+        def get_path(obj: Any) -> Any:
+            for get in getters:
+                obj = get(obj)
+            return obj
+
+        return get_path
+
+    def get(obj: Any) -> Any:
+        if _plain(obj):
+            return getattr(obj, key, None)
+        return get_value(key, obj)
+
+    return get
+
+
+def _format_boolean(value: Any) -> bool:
+    return value if value is True or value is False else boolean(value)
+
+
+_converters: Dict[type, Callable[[Any], Any]] = {
+    fields.Raw: lambda value: value,
+    fields.String: str,
+    fields.Integer: int,
+    fields.Float: float,
+    fields.Boolean: _format_boolean,
+}
+
+
+def _compile_scalar(
+    field: fields.Raw, key: Hashable, convert: Callable[[Any], Any]
+) -> Binder:
+    get = attribute_getter(key if field.attribute is None else field.attribute)
+
+    def bind() -> Getter:
+        default = field._v("default")
+        missing = field.format(default) if default else default
+
+        def getter(obj: Any) -> Any:
+            value = get(obj)
+            if value is None:
+                return missing
+            try:
+                return convert(value)
+            except (ValueError, TypeError):
+                # raises restx's error
+                return field.output(key, obj)
+
+        return getter
+
+    return bind
+
+
+def _compile_datetime(field: fields.DateTime, key: Hashable) -> Binder:
+    if field.dt_format != "iso8601":
+        return _compile_scalar(field, key, field.format)
+    return _compile_scalar(
+        field,
+        key,
+        lambda value: value.isoformat()
+        if type(value) is datetime
+        else field.format(value),
+    )
+
+
+def _compile_is_current(field: IsCurrent, key: Hashable) -> Binder:
+    get = attribute_getter(key if field.attribute is None else field.attribute)
+
+    def bind() -> Getter:
+        current = field.current()
+        return lambda obj: get(obj) == current
+
+    return bind
+
+
+def _compile_nested(field: fields.Nested, key: Hashable) -> Binder:
+    nested = compile_fields(field.nested, field.skip_none)
+    if nested is None:
+        raise _NotCompilable()
+    get = attribute_getter(key if field.attribute is None else field.attribute)
+
+    def bind() -> Getter:
+        row = nested.bind()
+
+        def getter(obj: Any) -> Any:
+            value = get(obj)
+            if value is None:
+                if field.allow_null:
+                    return None
+                elif field.default is not None:
+                    return field.default
+            return row(value)
+
+        return getter
+
+    return bind
+
+
+def _compile_list(field: fields.List, key: Hashable) -> Binder:
+    container = field.container
+    if isinstance(container, fields.Nested) or type(container) is fields.Raw:
+        raise _NotCompilable()
+    attribute = container.attribute
+    # restx marshals items without attribute as the items themselves
+    bind_item = _compile_field(container, lambda item: item)
+    get = attribute_getter(key if field.attribute is None else field.attribute)
+
+    def bind() -> Getter:
+        item_getter = bind_item()
+
+        def getter(obj: Any) -> Any:
+            value = get(obj)
+            if not isinstance(value, (list, tuple, set)):
+                return field.output(key, obj)
+            items = []
+            for item in value:
+                if isinstance(item, dict) or (
+                    attribute and not hasattr(item, attribute)
+                ):
+                    return field.format(value)
+                items.append(item_getter(item))
+            return items
+
+        return getter
+
+    return bind
+
+
+def _compile_url(field: fields.Url, key: Hashable) -> Binder:
+    if field.absolute:
+        raise _NotCompilable()
+    query = getattr(field, "query", None)
+    output = partial(field.output, key)
+
+    def bind() -> Getter:
+        reqctx = _request_ctx_stack.top
+        if reqctx is None or any(current_app.url_default_functions.values()):
+            return output
+        endpoint = field.endpoint if field.endpoint is not None else request.endpoint
+        if endpoint[:1] == ".":
+            blueprint = request.blueprint
+            endpoint = blueprint + endpoint if blueprint is not None else endpoint[1:]
+        rules = current_app.url_map._rules_by_endpoint.get(endpoint, [])
+        if len(rules) != 1:
+            return output
+        arguments = tuple(rules[0].arguments)
+        build = reqctx.url_adapter.build
+
+        def getter(obj: Any) -> Any:
+            if hasattr(obj, "__marshallable__"):
+                return output(obj)
+            values = obj if hasattr(obj, "__getitem__") else obj.__dict__
+            try:
+                url = build(endpoint, {name: values[name] for name in arguments})
+            except KeyError:
+                return output(obj)
+            if url.startswith("//") or any(char in url for char in "?#;"):
+                url = urlunparse(("", "", urlparse(url).path, "", "", ""))
+            if query:
+                url = urlunparse(
+                    (
+                        "",
+                        "",
+                        url,
+                        "",
+                        urlencode(
+                            {k: field.get_value(val, obj) for k, val in query.items()}
+                        ),
+                        "",
+                    )
+                )
+            return url
+
+        return getter
+
+    return bind
+
+
+def _compile_field(field: Any, key: Hashable) -> Binder:
+    if isinstance(field, dict):
+        nested = compile_fields(field)
+        if nested is None:
+            raise _NotCompilable()
+        return nested.bind
+    if isinstance(field, type):
+        field = field()
+    if getattr(field, "mask", None):
+        raise _NotCompilable()
+    kind = type(field)
+    if kind in _converters:
+        return _compile_scalar(field, key, _converters[kind])
+    if kind is fields.DateTime:
+        return _compile_datetime(field, key)
+    if kind is IsCurrent:
+        return _compile_is_current(field, key)
+    if kind is fields.Nested:
+        return _compile_nested(field, key)
+    if kind is fields.List:
+        return _compile_list(field, key)
+    if kind in (fields.Url, UrlWArgs):
+        return _compile_url(field, key)
+    raise _NotCompilable()
+
+
+def compile_fields(fields_: Any, skip_none: bool = False) -> Optional[CompiledFields]:
+    """Compiles a restx model or fields dict, None when it can't be compiled
+
+    Models with masks, wildcards or custom fields are left to restx.
+    Compiled fields are cached by the model's identity.
+    """
+    cache_key = (id(fields_), skip_none)
+    cached = _compiled.get(cache_key)
+    if cached is not None and cached[0] is fields_:
+        return cached[1]
+    compiled = None
+    if not getattr(fields_, "__mask__", None):
+        resolved = getattr(fields_, "resolved", fields_)
+        try:
+            compiled = CompiledFields(
+                {key: _compile_field(field, key) for key, field in resolved.items()},
+                skip_none,
+            )
+        except (_NotCompilable, RecursionError):
+            # recursive models are left to restx as well
+            pass
+    with _compiled_lock:
+        _compiled[cache_key] = (fields_, compiled)
+    return compiled
+
+
+def row_marshaller(fields_: Any, skip_none: bool = False) -> Callable[[Any], Any]:
+    """Returns a function marshalling rows one at a time with fields_
+
+    Compiled fields are bound to the current request once.
+    """
+    compiled = compile_fields(fields_, skip_none)
+    if compiled is None:
+        return partial(restx_marshal, fields=fields_, skip_none=skip_none)
+    return compiled.bind()
+
+
+def marshal(
+    data: Any,
+    fields_: Any,
+    envelope: str = None,
+    skip_none: bool = False,
+    mask: Any = None,
+    ordered: bool = False,
+) -> Any:
+    """Restx's marshal running compiled fields, masked or ordered output
+    falls back to restx"""
+    compiled = None if mask or ordered else compile_fields(fields_, skip_none)
+    if compiled is None:
+        return restx_marshal(data, fields_, envelope, skip_none, mask, ordered)
+    out = compiled(data)
+    return {envelope: out} if envelope else out
+
+
+class marshal_with(restx_marshal_with):
+    """Restx's marshal_with decorator using compiled fields"""
+
+    def __call__(self, f: Callable) -> Callable:
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            resp = f(*args, **kwargs)
+            mask = self.mask
+            if has_app_context():
+                mask_header = current_app.config["RESTX_MASK_HEADER"]
+                mask = request.headers.get(mask_header) or mask
+            if isinstance(resp, tuple):
+                data, code, headers = unpack(resp)
+                return (
+                    marshal(
+                        data,
+                        self.fields,
+                        self.envelope,
+                        self.skip_none,
+                        mask,
+                        self.ordered,
+                    ),
+                    code,
+                    headers,
+                )
+            return marshal(
+                resp, self.fields, self.envelope, self.skip_none, mask, self.ordered
+            )
+
+        return wrapper
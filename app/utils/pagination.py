@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from flask import current_app
+from sqlalchemy.exc import CompileError, DBAPIError
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.expression import and_, or_, text
+
+from app.database import BaseModel, db
+from app.exceptions import InvalidUsage
+
+from .cache import TTLCache
+
+# ordering column's attribute name and whether it's descending
+Ordering = List[Tuple[str, bool]]
+
+count_cache = TTLCache(maxsize=1024, ttl=30)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_ordering(columns: Sequence[str]) -> Ordering:
+    """Parses ordering attributes names, a leading "-" means descending order.
+    The row id is appended as a tie breaker when not included.
+    """
+    ordering = [(column.lstrip("-"), column.startswith("-")) for column in columns]
+    if "id" not in [name for name, _ in ordering]:
+        ordering.append(("id", False))
+    return ordering
+
+
+def encode_cursor(row: Any, ordering: Ordering) -> str:
+    """Encodes row's ordering values into an opaque cursor"""
+    values = [getattr(row, name) for name, _ in ordering]
+    payload = json.dumps(
+        [
+            value.isoformat() if isinstance(value, (date, datetime)) else value
+            for value in values
+        ],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, db_model: BaseModel, ordering: Ordering) -> List[Any]:
+    """Decodes a cursor back to the ordering values of the row it points to"""
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        )
+        assert isinstance(values, list) and len(values) == len(ordering)
+        decoded = []
+        for (name, _), value in zip(ordering, values):
+            python_type = getattr(db_model, name).type.python_type
+            if value is not None and python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except (AssertionError, ValueError, TypeError, binascii.Error):
+        raise InvalidUsage.custom_error("Invalid pagination cursor", 400)
+
+
+def order_query(query: Query, db_model: BaseModel, ordering: Ordering) -> Query:
+    return query.order_by(
+        *[
+            getattr(db_model, name).desc() if desc else getattr(db_model, name).asc()
+            for name, desc in ordering
+        ]
+    )
+
+
+def keyset_paginate(
+    query: Query, db_model: BaseModel, ordering: Ordering, cursor: str, limit: int
+) -> Query:
+    """Orders query and returns the rows after the cursor's row
+
+    Args:
+        query (Query): query to paginate
+        db_model (BaseModel): model holding the ordering attributes
+        ordering (Ordering): ordering attributes, as returned by parse_ordering
+        cursor (str): cursor of the last received row, empty for the first page
+        limit (int): page size
+    """
+    columns = [getattr(db_model, name) for name, _ in ordering]
+    query = order_query(query, db_model, ordering)
+    if cursor:
+        values = decode_cursor(cursor, db_model, ordering)
+        query = query.filter(
+            or_(
+                *[
+                    and_(
+                        *[columns[j] == values[j] for j in range(i)],
+                        columns[i] < values[i]
+                        if ordering[i][1]
+                        else columns[i] > values[i],
+                    )
+                    for i in range(len(columns))
+                ]
+            )
+        )
+    return query.limit(limit)
+
+
+def estimate_count(query: Query) -> Optional[int]:
+    """Estimates query's rows count from postgresql's planner statistics
+
+    Unfiltered queries read the table's ``pg_class.reltuples``, filtered ones
+    the planner's rows estimate, explaining the statement with its bound
+    parameters. Returns None on other dialects, when the table has not been
+    analyzed yet or when estimating fails, within a savepoint so the
+    transaction remains usable.
+    """
+    if db.engine.dialect.name != "postgresql":
+        return None
+    statement = query.statement
+    froms = statement.froms
+    connection = db.session.connection()
+    try:
+        with connection.begin_nested():
+            if statement.whereclause is None and len(froms) == 1:
+                estimate = connection.execute(
+                    text(
+                        "SELECT reltuples::bigint FROM pg_class"
+                        " WHERE oid = to_regclass(:table)"
+                    ),
+                    {"table": froms[0].name},
+                ).scalar()
+            else:
+                compiled = statement.compile(connection)
+                params = compiled.params
+                if compiled.positional:
+                    params = tuple(params[name] for name in compiled.positiontup)
+                plan = connection.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {compiled}", params
+                ).scalar()
+                estimate = plan[0]["Plan"]["Plan Rows"]
+    except (CompileError, DBAPIError) as e:
+        logger.warning("Estimating a count failed: %r", e)
+        return None
+    return int(estimate) if estimate is not None and estimate >= 0 else None
+
+
+def count_rows(query: Query, mode: str = "exact") -> Optional[int]:
+    """Counts query's rows
+
+    Args:
+        query (Query): filtered query, its ordering and limits are ignored
+        mode (str): "exact", "cached" for an exact count cached for
+            PAGINATION_COUNT_CACHE_TTL seconds, "estimated" for planner's
+            estimates, falling back to exact ones, or "false" to skip counting.
+    """
+    if mode == "false":
+        return None
+    query = query.order_by(None).limit(None).offset(None)
+    if mode == "estimated":
+        estimate = estimate_count(query)
+        if estimate is not None:
+            return estimate
+    if mode != "cached":
+        return query.count()
+
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    count = count_cache.get(key)
+    if count is None:
+        count = query.count()
+        count_cache.set(
+            key, count, ttl=current_app.config["PAGINATION_COUNT_CACHE_TTL"]
+        )
+    return count
@@ -3,3 +3,32 @@ from flask_restx.reqparse import RequestParser
 offset_parser = RequestParser()
 offset_parser.add_argument("offset", type=int, location="args", required=False)
 offset_parser.add_argument("limit", type=int, location="args", required=False)
+
+cursor_parser = offset_parser.copy()
+cursor_parser.add_argument(
+    "after",
+    type=str,
+    location="args",
+    required=False,
+    help="Cursor of the last received row, empty for the first page",
+)
+cursor_parser.add_argument(
+    "count",
+    choices=["exact", "cached", "estimated", "false"],
+    default="exact",
+    type=str,
+    location="args",
+    required=False,
+    help="How the total count is computed, false skips it",
+)
+
+export_parser = RequestParser()
+export_parser.add_argument(
+    "format",
+    choices=["ndjson", "csv"],
+    default="ndjson",
+    type=str,
+    location="args",
+    required=False,
+    help="Exported file's format",
+)
@@ -0,0 +1,113 @@
+import re
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy import column, select, text
+from sqlalchemy.sql.expression import TableClause
+from sqlalchemy.sql.schema import Table
+
+from app.database import db
+
+PARTITION_NAME = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$")
+
+
+def month_start(value: datetime, months: int = 0) -> datetime:
+    """Returns the first instant of value's month, shifted by months"""
+    month = value.year * 12 + value.month - 1 + months
+    return value.replace(
+        year=month // 12,
+        month=month % 12 + 1,
+        day=1,
+        hour=0,
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Partitions are bounded by months in UTC"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start.year:04d}_{start.month:02d}"
+
+
+def is_partitioned(table: str) -> bool:
+    """Whether table is a postgresql partitioned table, always False elsewhere"""
+    if db.engine.dialect.name != "postgresql":
+        return False
+    return db.session.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table partitioned"
+            " JOIN pg_class class ON class.oid = partitioned.partrelid"
+            " WHERE class.relname = :table)"
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def monthly_partitions(table: str) -> Dict[str, datetime]:
+    """Returns the monthly partitions of table by their names, with the
+    start of the month they hold"""
+    names = db.session.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    ).scalars()
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match is not None and match.group("table") == table:
+            partitions[name] = datetime(
+                int(match.group("year")), int(match.group("month")), 1
+            )
+    return partitions
+
+
+def create_monthly_partitions(table: str, start: datetime, end: datetime) -> List[str]:
+    """Creates table's missing monthly partitions from start's month up to
+    end's month included and returns their names"""
+    existing = monthly_partitions(table)
+    created = []
+    month, end = month_start(naive_utc(start)), naive_utc(end)
+    while month <= end:
+        name = partition_name(table, month)
+        if name not in existing:
+            # bounds can't be bound parameters
+            db.session.execute(
+                text(
+                    f'CREATE TABLE "{name}" PARTITION OF "{table}"'
+                    f" FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00')"
+                    f" TO ('{month_start(month, 1):%Y-%m-%d} 00:00:00+00')"
+                )
+            )
+            created.append(name)
+        month = month_start(month, 1)
+    return created
+
+
+def drop_monthly_partitions(table: str, before: datetime) -> List[str]:
+    """Drops table's monthly partitions ending before the given date and
+    returns their names"""
+    dropped = []
+    for name, start in sorted(monthly_partitions(table).items()):
+        if month_start(start, 1) <= naive_utc(before):
+            db.session.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+    return dropped
+
+
+def copy_rows(source: str, target: Table) -> int:
+    """Copies source's rows into target, matching columns by name rather than
+    by position, and returns how many were copied"""
+    names = [target_column.name for target_column in target.columns]
+    rows = select(*TableClause(source, *[column(name) for name in names]).columns)
+    return db.session.execute(target.insert().from_select(names, rows)).rowcount
@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Optional, TypeVar
+
+from flask.app import Flask
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+from app.exceptions import InvalidUsage
+
+T = TypeVar("T")
+
+
+def hash_method_prefix(method: str) -> str:
+    """Returns the method prefix werkzeug stores in front of a hash's salt"""
+    if method.startswith("pbkdf2:") and method.count(":") == 1:
+        return f"{method}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords with the configured method and cost.
+
+    KDF work may run inline or on a bounded thread or process pool, and at
+    most ``PASSWORD_HASH_CONCURRENCY`` hashes run at once per worker. Requests
+    waiting longer than ``PASSWORD_HASH_WAIT`` seconds for a slot are rejected.
+    """
+
+    method = "pbkdf2:sha256"
+    salt_length = 16
+    executor_type = "inline"
+    workers = 2
+    wait: Optional[float] = None
+
+    def __init__(self) -> None:
+        self._executor: Optional[Executor] = None
+        self._executor_pid: Optional[int] = None
+        self._executor_lock = Lock()
+        self._slots = BoundedSemaphore(4)
+
+    def init_app(self, app: Flask) -> None:
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self.salt_length = app.config["PASSWORD_SALT_LENGTH"]
+        self.executor_type = app.config["PASSWORD_HASH_EXECUTOR"]
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.wait = app.config["PASSWORD_HASH_WAIT"]
+        self._slots = BoundedSemaphore(app.config["PASSWORD_HASH_CONCURRENCY"])
+        self.shutdown()
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        """Lazily created pool, recreated in forked workers"""
+        if self.executor_type == "inline":
+            return None
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                pool_class = (
+                    ProcessPoolExecutor
+                    if self.executor_type == "process"
+                    else ThreadPoolExecutor
+                )
+                self._executor = pool_class(max_workers=self.workers)
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _run(self, fn: Callable[..., T], *args) -> T:
+        if not self._slots.acquire(timeout=self.wait):
+            raise InvalidUsage.custom_error(
+                "Server is busy, please try again later", 503
+            )
+        try:
+            executor = self.executor
+            if executor is None:
+                return fn(*args)
+            return executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(
+            generate_password_hash, password, self.method, self.salt_length
+        )
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """Checks if a hash was generated with other than the configured method
+        or salt length"""
+        parts = pwhash.split("$", 2)
+        return (
+            len(parts) != 3
+            or parts[0] != hash_method_prefix(self.method)
+            or len(parts[1]) != self.salt_length
+        )
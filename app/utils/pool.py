@@ -0,0 +1,65 @@
+import time
+from threading import Lock
+from typing import Any, Dict
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class PoolMetricsMixin:
+    """Records connection checkouts and how long they waited for a connection
+
+    Wait time includes opening a new connection when the pool has none idle.
+    Counters are kept per pool, i.e. per worker process.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)  # type: ignore
+        self._metrics_lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore
+        except TimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            stats = {
+                "pool": self.__class__.__name__,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waitAvgMs": round(self.wait_total / self.checkouts * 1000, 3)
+                if self.checkouts
+                else 0,
+                "waitMaxMs": round(self.wait_max * 1000, 3),
+            }
+        if isinstance(self, QueuePool):
+            stats.update(
+                size=self.size(),
+                checkedIn=self.checkedin(),
+                checkedOut=self.checkedout(),
+                overflow=self.overflow(),
+            )
+        return stats
+
+
+class InstrumentedQueuePool(PoolMetricsMixin, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(PoolMetricsMixin, NullPool):
+    pass
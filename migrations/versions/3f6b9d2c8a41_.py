@@ -0,0 +1,41 @@
+"""add sessions expiry date
+
+Revision ID: 3f6b9d2c8a41
+Revises: b81d4f2a6c93
+Create Date: 2026-10-18 14:21:43.108275
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from flask import current_app
+
+# revision identifiers, used by Alembic.
+revision = "3f6b9d2c8a41"
+down_revision = "b81d4f2a6c93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "sessions",
+        sa.Column(
+            "expires_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=True,
+            comment="session's expiry date",
+        ),
+    )
+    # existing sessions expire with the configured access token lifetime, as
+    # new ones do
+    expires = int(current_app.config["JWT_ACCESS_TOKEN_EXPIRES"].total_seconds())
+    op.execute(
+        f"UPDATE sessions SET expires_at = created_at + interval '{expires} seconds'"
+    )
+    op.alter_column("sessions", "expires_at", nullable=False)
+    op.create_index("ix_sessions_expires_at", "sessions", ["expires_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_sessions_expires_at", table_name="sessions")
+    op.drop_column("sessions", "expires_at")
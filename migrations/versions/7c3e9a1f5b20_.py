@@ -0,0 +1,56 @@
+"""index hot lookup columns
+
+Revision ID: 7c3e9a1f5b20
+Revises: 4e82c6ed8997
+Create Date: 2026-10-18 09:12:40.118203
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7c3e9a1f5b20"
+down_revision = "4e82c6ed8997"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_sessions_token", "sessions", ["token"], unique=False)
+    op.create_index("ix_sessions_user_id", "sessions", ["user_id"], unique=False)
+    # drop duplicated pairs before enforcing uniqueness
+    op.execute(
+        """
+        DELETE FROM user_roles duplicate
+        USING user_roles original
+        WHERE duplicate.id > original.id
+            AND duplicate.user_id = original.user_id
+            AND duplicate.role_id = original.role_id
+        """
+    )
+    op.create_index(
+        "ix_user_roles_user_id_role_id",
+        "user_roles",
+        ["user_id", "role_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_users_lower_username",
+        "users",
+        [sa.text("lower(username)")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_users_lower_email",
+        "users",
+        [sa.text("lower(email)")],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_users_lower_email", table_name="users")
+    op.drop_index("ix_users_lower_username", table_name="users")
+    op.drop_index("ix_user_roles_user_id_role_id", table_name="user_roles")
+    op.drop_index("ix_sessions_user_id", table_name="sessions")
+    op.drop_index("ix_sessions_token", table_name="sessions")
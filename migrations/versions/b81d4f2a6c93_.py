@@ -0,0 +1,81 @@
+"""add storage jobs queue
+
+Revision ID: b81d4f2a6c93
+Revises: 7c3e9a1f5b20
+Create Date: 2026-10-18 11:02:17.530614
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b81d4f2a6c93"
+down_revision = "7c3e9a1f5b20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "storage_jobs",
+        sa.Column(
+            "id",
+            sa.INTEGER(),
+            nullable=False,
+            comment="Unique row identifier",
+        ),
+        sa.Column("key", sa.String(), nullable=False, comment="Idempotency key"),
+        sa.Column("operation", sa.String(), nullable=False, comment="save or delete"),
+        sa.Column(
+            "target", sa.String(), nullable=False, comment="Storage target's name"
+        ),
+        sa.Column("url", sa.String(), nullable=False, comment="Stored file's url"),
+        sa.Column("name", sa.String(), nullable=True, comment="Uploaded file's name"),
+        sa.Column(
+            "public",
+            sa.BOOLEAN(),
+            server_default=sa.text("false"),
+            nullable=False,
+        ),
+        sa.Column(
+            "staged_path",
+            sa.String(),
+            nullable=True,
+            comment="Staged file's local path",
+        ),
+        sa.Column(
+            "status",
+            sa.String(),
+            nullable=False,
+            comment="pending, done, failed or cancelled",
+        ),
+        sa.Column("attempts", sa.INTEGER(), nullable=False, comment="Attempts count"),
+        sa.Column(
+            "run_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            comment="Next attempt's date",
+        ),
+        sa.Column(
+            "last_error", sa.String(), nullable=True, comment="Last attempt's error"
+        ),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            comment="Queuing date",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_storage_jobs")),
+        sa.UniqueConstraint("key", name=op.f("uq_storage_jobs_key")),
+    )
+    op.create_index(
+        "ix_storage_jobs_status_run_at",
+        "storage_jobs",
+        ["status", "run_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_storage_jobs_status_run_at", table_name="storage_jobs")
+    op.drop_table("storage_jobs")
@@ -27,6 +27,32 @@ class UserDict(TypedDict):
     roles: List[str]
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="run the tests marked as benchmarks",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: times code paths and records them as test properties, "
+        "only run with --benchmark",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture()
 def db_location():
     loc = os.path.join(os.getcwd(), "tests", "test_db.db")
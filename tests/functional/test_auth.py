@@ -16,6 +16,19 @@ def test_login(client: FlaskClient, site_user: UserDict):
     assert res_json["username"].lower() == site_user["username"] and "token" in res_json
 
 
+def test_wrong_login(test_app: Flask, client: ExtendedClient, site_user: UserDict):
+    """User errors are answered by the api's handlers instead of 500s"""
+    test_app.config["PROPAGATE_EXCEPTIONS"] = False
+
+    rv: Response = client().post(
+        "/v1/users/login",
+        data=dict(username=site_user["username"], password="wrong"),
+    )
+
+    assert rv.status_code == 404
+    assert rv.get_json()["errors"] == ["Username or password are not correct"]
+
+
 def test_logout(test_app: Flask, client: ExtendedClient, site_user: UserDict):
     from app.apis.v1.users.models import User
 
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+from flask import Flask
+
+from tests.helpers import ExtendedClient, UserDict, count_statements
+
+
+def test_auth_statements(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    """Counts statements needed to resolve an authenticated request's identity"""
+    from app.apis.v1.users.models import Session, User
+    from app.database import db
+    from app.extensions import identity_cache
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        user = User.get(username=admin_user["username"])
+        token = Session.query.filter(Session.user_id == user.id).first().token
+        db.session.remove()
+
+        with count_statements() as before:
+            session = Session.get(token=token, user_id=user.id)
+            user_ = User.get(session.user_id)
+            roles = [role.name for role in user_.roles]
+        db.session.remove()
+
+        with count_statements() as after:
+            user_ = User.get_by_session(token=token, user_id=user.id)
+            assert [role.name for role in user_.roles] == roles
+        db.session.remove()
+
+        assert User.get_by_session(token="invalid", user_id=user.id) is None
+
+        ttl = identity_cache.ttl
+        identity_cache.ttl = 0
+        try:
+            with count_statements() as uncached:
+                admin_client.get("/v1/users/")
+        finally:
+            identity_cache.ttl = ttl
+        admin_client.get("/v1/users/")
+        with count_statements() as cached:
+            rv = admin_client.get("/v1/users/")
+
+        assert rv.get_json()["roles"] == ["admin"]
+        assert len(before) == 3 and len(after) == 1
+        assert len(uncached) == 1 and len(cached) == 0
+
+
+def test_identity_modes(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    """Identities resolve the same through principal's signals & directly"""
+    from flask import g
+    from flask_principal import identity_loaded
+
+    from app.apis.v1.users.models import Session, User
+    from app.extensions import jwt
+
+    client("admin")
+    loaded = []
+
+    def on_identity_loaded(sender, identity):
+        loaded.append(identity.id)
+
+    with test_app.test_request_context():
+        user = User.get(username=admin_user["username"])
+        token = Session.query.filter(Session.user_id == user.id).first().token
+        jwt_data = {"jti": token, "user": user.id}
+        for signals in [True, False]:
+            test_app.config["IDENTITY_SIGNALS"] = signals
+            jwt._user_lookup_callback({}, jwt_data)
+            assert g.identity.id == jwt_data["user"]
+            assert g.identity.roles == frozenset({"admin"})
+
+        # plugins connecting to identity_loaded are still notified
+        with identity_loaded.connected_to(on_identity_loaded, test_app):
+            jwt._user_lookup_callback({}, jwt_data)
+        assert loaded == [jwt_data["user"]]
+
+
+@pytest.mark.benchmark
+def test_identity_modes_benchmark(
+    test_app: Flask, client: ExtendedClient, admin_user: UserDict, record_property
+):
+    """Times identity resolution through principal's signals & directly"""
+    from app.apis.v1.users.models import Session, User
+    from app.extensions import jwt
+
+    client("admin")
+    with test_app.test_request_context():
+        user = User.get(username=admin_user["username"])
+        token = Session.query.filter(Session.user_id == user.id).first().token
+        jwt_data = {"jti": token, "user": user.id}
+        calls = 2000
+        for signals in [True, False]:
+            test_app.config["IDENTITY_SIGNALS"] = signals
+            jwt._user_lookup_callback({}, jwt_data)
+            start = time.perf_counter()
+            for _ in range(calls):
+                jwt._user_lookup_callback({}, jwt_data)
+            record_property(
+                f"{'signals' if signals else 'direct'}_us",
+                (time.perf_counter() - start) / calls * 1e6,
+            )
+
+
+def test_identity_sessions(test_app: Flask, client: ExtendedClient):
+    """Principal keeps identities in the session only in signals mode"""
+    from flask_principal import session_identity_loader
+
+    from app import create_app
+    from app.settings import TestConfig
+
+    principal = test_app.extensions["principal"]
+    assert not principal.use_sessions
+    assert not principal.identity_loaders and not principal.identity_savers
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        rv = admin_client.get("/v1/users/")
+        assert rv.status_code == 200
+        with admin_client.session_transaction() as session:
+            assert "identity.id" not in session
+
+    class SignalsConfig(TestConfig):
+        IDENTITY_SIGNALS = True
+
+    principal = create_app(SignalsConfig).extensions["principal"]
+    assert principal.use_sessions
+    assert list(principal.identity_loaders) == [session_identity_loader]
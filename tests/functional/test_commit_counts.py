@@ -0,0 +1,81 @@
+import io
+
+from flask import Flask
+
+from tests.helpers import (
+    ExtendedClient,
+    UserDict,
+    add_sessions,
+    count_commits,
+    png_image,
+)
+
+
+def test_commits_per_endpoint(
+    test_app: Flask, client: ExtendedClient, admin_user: UserDict, site_user: UserDict
+):
+    """Writing endpoints commit a single transaction each"""
+    from app.apis.v1.roles.models import Role
+    from app.apis.v1.users.models import User
+
+    test_app.config["STORAGE_TARGET"] = "memory"
+    with test_app.app_context():
+        admin_client = client("admin")
+        user_id = User.get(username=admin_user["username"]).id
+        site_user_id = User.get(username=site_user["username"]).id
+        role_id = Role.get(name="admin").id
+        add_sessions(user_id, 50)
+        new_user = {
+            "username": "new_user",
+            "pwd": "123456",
+            "pwdCheck": "123456",
+            "email": "new@example.com",
+            "firstName": "new",
+            "lastName": "user",
+        }
+        requests = {
+            "POST /users": lambda: admin_client.post("/v1/users/", data=new_user),
+            "PUT /users/<id>": lambda: admin_client.put(
+                f"/v1/users/{user_id}",
+                data={
+                    "firstName": "Admin",
+                    "photo": (io.BytesIO(png_image()), "a.png"),
+                },
+                content_type="multipart/form-data",
+            ),
+            "DELETE /users/<id>/sessions": lambda: admin_client.delete(
+                f"/v1/users/{user_id}/sessions"
+            ),
+            "PUT /roles/<id>": lambda: admin_client.put(
+                f"/v1/roles/{role_id}", json={"description": "Admins"}
+            ),
+            "POST /roles/<id>/users": lambda: admin_client.post(
+                f"/v1/roles/{role_id}/users", json={"users": [site_user_id]}
+            ),
+            "PUT /roles/<id>/users": lambda: admin_client.put(
+                f"/v1/roles/{role_id}/users", json={"users": [user_id]}
+            ),
+            "POST /users/login": lambda: admin_client.post(
+                "/v1/users/login",
+                data={
+                    "username": admin_user["username"],
+                    "password": admin_user["password"],
+                },
+            ),
+        }
+        counts = {}
+        for name, request in requests.items():
+            with count_commits() as commits:
+                rv = request()
+            assert rv.status_code == 200, (name, rv.get_json())
+            counts[name] = len(commits)
+
+        with count_commits() as commits:
+            rv = admin_client.post(
+                f"/v1/roles/{role_id}", json={"users": [user_id, 999999]}
+            )
+        assert rv.status_code == 401
+        assert not commits
+        assert Role.get(name="admin").users[0].id == user_id
+
+    assert counts == dict.fromkeys(requests, 1)
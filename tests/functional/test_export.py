@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+import tracemalloc
+from typing import Tuple
+
+from flask import Flask
+
+from tests.helpers import ExtendedClient, UserDict, add_sessions
+
+
+def streamed_peak(client: ExtendedClient, url: str) -> Tuple[int, int]:
+    """Consumes a streamed response, returns its lines & traced memory peak"""
+    tracemalloc.start()
+    try:
+        rv = client.get(url, buffered=False)
+        lines = sum(chunk.count(b"\n") for chunk in rv.response)
+        rv.close()
+        return lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_sessions(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    """Sessions are streamed as NDJSON or CSV with the paginated list's fields"""
+    from app.apis.v1.users.models import User
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        user = User.get(username=admin_user["username"])
+        add_sessions(user.id, 20)
+        url = f"/v1/users/{user.id}/sessions"
+
+        listed = admin_client.get(url, query_string={"limit": 100}).get_json()["data"]
+        rv = admin_client.get(f"{url}/export")
+        assert rv.status_code == 200
+        assert rv.mimetype == "application/x-ndjson"
+        assert f"user-{user.id}-sessions.ndjson" in rv.headers["Content-Disposition"]
+        exported = [json.loads(line) for line in rv.data.splitlines()]
+        assert sorted(exported, key=lambda row: row["id"]) == sorted(
+            listed, key=lambda row: row["id"]
+        )
+
+        rv = admin_client.get(f"{url}/export", query_string={"format": "csv"})
+        assert rv.mimetype == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(rv.data.decode())))
+        assert [int(row["id"]) for row in rows] == [row["id"] for row in exported]
+        assert rows[0]["url"] == exported[0]["url"]
+
+        rv = admin_client.get(f"{url}/export", query_string={"format": "xml"})
+        assert rv.status_code == 400
+
+
+def test_export_users(test_app: Flask, client: ExtendedClient):
+    """Users are exported with their roles, JSON encoded in CSV cells"""
+    with test_app.app_context():
+        admin_client = client("admin")
+        rv = admin_client.get("/v1/users/export")
+        users = [json.loads(line) for line in rv.data.splitlines()]
+        assert [user["roles"] for user in users] == [["admin"], ["user"]]
+
+        rv = admin_client.get("/v1/users/export", query_string={"format": "csv"})
+        rows = list(csv.DictReader(io.StringIO(rv.data.decode())))
+        assert [json.loads(row["roles"]) for row in rows] == [["admin"], ["user"]]
+
+
+def test_export_memory(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    """Streaming memory doesn't grow with the number of exported rows"""
+    from app.apis.v1.users.models import User
+
+    test_app.config["EXPORT_BATCH_SIZE"] = 100
+    with test_app.app_context():
+        admin_client = client("admin")
+        user = User.get(username=admin_user["username"])
+        url = f"/v1/users/{user.id}/sessions/export"
+        add_sessions(user.id, 500)
+        # warms up compiled models and statement caches
+        streamed_peak(admin_client, url)
+        small_lines, small_peak = streamed_peak(admin_client, url)
+        add_sessions(user.id, 4500)
+        large_lines, large_peak = streamed_peak(admin_client, url)
+
+    assert large_lines == small_lines + 4500
+    assert large_peak < small_peak * 2
+
+
+def test_export_sessions_permissions(
+    test_app: Flask, client: ExtendedClient, admin_user: UserDict, site_user: UserDict
+):
+    """Admins export anyone's sessions, other users only their own"""
+    from flask_jwt_extended import create_access_token, get_jti
+
+    from app.apis.v1.users.models import Session, User
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        admin = User.get(username=admin_user["username"])
+        user = User.get(username=site_user["username"])
+        add_sessions(user.id, 3)
+        admin_id, user_id = admin.id, user.id
+
+        rv = admin_client.get(f"/v1/users/{user_id}/sessions/export")
+        assert rv.status_code == 200
+        assert len(rv.data.splitlines()) == 3
+
+        # a session for the site user, sent as a header to skip the cookies
+        token = create_access_token(user)
+        Session(
+            user=user,
+            token=get_jti(token),
+            ip_address=None,
+            platform=None,
+            browser=None,
+        ).save()
+        headers = {"Authorization": f"Bearer {token}"}
+        rv = test_app.test_client().get(
+            f"/v1/users/{admin_id}/sessions/export", headers=headers
+        )
+        assert rv.status_code == 401
+        rv = test_app.test_client().get(
+            f"/v1/users/{user_id}/sessions/export", headers=headers
+        )
+        assert rv.status_code == 200
+        assert len(rv.data.splitlines()) == 4
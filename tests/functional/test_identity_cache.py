@@ -0,0 +1,33 @@
+from flask import Flask, Response
+
+from tests.helpers import ExtendedClient, UserDict
+
+
+def test_identity_cache(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    from app.apis.v1.users.models import User
+    from app.extensions import identity_cache
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        user = User.get(username=admin_user["username"])
+        misses = identity_cache.misses
+
+        for _ in range(3):
+            rv: Response = admin_client.get(f"/v1/users/{user.id}")
+            assert rv.get_json().get("username") == user.username
+            rv = admin_client.get("/v1/users/")
+            assert rv.get_json()["roles"] == ["admin"]
+
+        assert identity_cache.misses == misses + 1
+        assert identity_cache.hits >= 5
+
+        rv = admin_client.get("/v1/system/stats")
+        assert rv.get_json()["identityCache"]["size"] == 1
+        assert rv.get_json()["pool"]["checkouts"] > 0
+
+        rv = admin_client.get("/v1/users/logout")
+        assert rv.status_code == 200
+        assert len(identity_cache) == 0
+
+        rv = admin_client.get(f"/v1/users/{user.id}")
+        assert rv.status_code == 401
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from app.exceptions import InvalidUsage
+from app.settings import TestConfig
+from tests.helpers import ExtendedClient, UserDict
+
+
+@pytest.fixture()
+def hasher(test_app: Flask):
+    from app.extensions import password_hasher
+
+    yield password_hasher
+    test_app.config.from_object(TestConfig)
+    password_hasher.init_app(test_app)
+
+
+def test_rehash_on_login(
+    test_app: Flask, client: ExtendedClient, site_user: UserDict, hasher
+):
+    """Stored hash is upgraded when logging in after hash settings change"""
+    from app.apis.v1.users.models import User
+    from app.database import db
+
+    with test_app.app_context():
+        client()
+        test_app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+        hasher.init_app(test_app)
+        user = User.get(username=site_user["username"])
+        old_hash = user._password
+        assert user.password.needs_rehash
+        db.session.remove()
+
+        rv = test_app.test_client().post(
+            "/v1/users/login",
+            data=dict(username=site_user["username"], password=site_user["password"]),
+        )
+        assert rv.status_code == 200
+
+        user = User.get(username=site_user["username"])
+        assert user._password != old_hash
+        assert user._password.startswith("pbkdf2:sha256:1000$")
+        assert not user.password.needs_rehash
+        assert user.password == site_user["password"]
+
+
+def test_needs_rehash(test_app: Flask, hasher):
+    """Hashes need rehashing when the method or the salt length changes"""
+    test_app.config.update(
+        PASSWORD_HASH_METHOD="pbkdf2:sha256:1000", PASSWORD_SALT_LENGTH=16
+    )
+    hasher.init_app(test_app)
+    pwhash = hasher.hash("secret")
+    assert not hasher.needs_rehash(pwhash)
+
+    test_app.config["PASSWORD_SALT_LENGTH"] = 24
+    hasher.init_app(test_app)
+    assert hasher.needs_rehash(pwhash)
+    assert not hasher.needs_rehash(hasher.hash("secret"))
+
+    test_app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:2000"
+    hasher.init_app(test_app)
+    assert hasher.needs_rehash(pwhash)
+    assert hasher.needs_rehash("not a hash")
+
+
+def test_hash_concurrency_cap(test_app: Flask, hasher):
+    """Hashing is rejected once all slots are busy for longer than the wait"""
+    test_app.config.update(PASSWORD_HASH_CONCURRENCY=1, PASSWORD_HASH_WAIT=0.01)
+    hasher.init_app(test_app)
+    pwhash = generate_password_hash("secret", "pbkdf2:sha256:1000")
+
+    hasher._slots.acquire()
+    with pytest.raises(InvalidUsage) as e:
+        hasher.verify(pwhash, "secret")
+    assert e.value.status_code == 503
+    hasher._slots.release()
+
+    assert hasher.verify(pwhash, "secret")
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("executor", ["inline", "thread", "process"])
+def test_login_throughput(test_app: Flask, hasher, record_property, executor: str):
+    """Benchmarks concurrent password verification per executor type"""
+    test_app.config.update(
+        PASSWORD_HASH_EXECUTOR=executor,
+        PASSWORD_HASH_WORKERS=4,
+        PASSWORD_HASH_CONCURRENCY=4,
+    )
+    hasher.init_app(test_app)
+    pwhash = generate_password_hash("secret", test_app.config["PASSWORD_HASH_METHOD"])
+    logins = 16
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as clients:
+        results = list(
+            clients.map(lambda _: hasher.verify(pwhash, "secret"), range(logins))
+        )
+    elapsed = time.perf_counter() - start
+
+    assert all(results)
+    record_property("verifications_per_s", logins / elapsed)
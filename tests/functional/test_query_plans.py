@@ -0,0 +1,57 @@
+from typing import List
+
+from flask import Flask
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.expression import or_, text
+from sqlalchemy.sql.functions import func
+
+from tests.helpers import ExtendedClient, UserDict
+
+
+def query_plan(query: Query) -> List[str]:
+    from app.database import db
+
+    engine = db.get_engine()
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "postgresql":
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+        return [row[0] for row in db.session.execute(text(f"EXPLAIN {sql}"))]
+    return [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def uses_index(plan: List[str], table: str) -> bool:
+    return any(table in step and "INDEX" in step.upper() for step in plan)
+
+
+def test_lookups_use_indexes(
+    test_app: Flask, client: ExtendedClient, admin_user: UserDict
+):
+    """Auth and login lookups are served by index scans"""
+    from app.apis.v1.users.models import Session, User
+
+    with test_app.app_context():
+        client("admin")
+        user = User.get(username=admin_user["username"])
+        token = Session.query.filter(Session.user_id == user.id).first().token
+
+        auth_plan = query_plan(
+            User.query.join(Session, Session.user_id == User.id).filter(
+                Session.token == token, User.id == user.id
+            )
+        )
+        assert uses_index(auth_plan, "sessions"), auth_plan
+
+        username = admin_user["username"].upper()
+        login_plan = query_plan(
+            User.query.filter(
+                or_(
+                    func.lower(User.email) == username.lower(),
+                    func.lower(User.username) == username.lower(),
+                )
+            )
+        )
+        assert uses_index(login_plan, "users"), login_plan
+        assert not any("SCAN users" in step for step in login_plan), login_plan
+
+        sessions_plan = query_plan(Session.query.filter(Session.user_id == user.id))
+        assert uses_index(sessions_plan, "sessions"), sessions_plan
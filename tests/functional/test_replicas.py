@@ -0,0 +1,125 @@
+import shutil
+from pathlib import Path
+
+from flask import Flask
+from sqlalchemy import create_engine, lambda_stmt, select, text, update
+
+from tests.helpers import ExtendedClient
+
+
+def make_replica(db_location: str, tmp_path: Path) -> str:
+    """Copies the primary database, with a role only the replica has"""
+    replica = tmp_path / "replica.db"
+    shutil.copy(db_location, replica)
+    engine = create_engine(f"sqlite:///{replica}")
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO roles (name, description) VALUES ('replica', '')")
+        )
+    engine.dispose()
+    return f"sqlite:///{replica}"
+
+
+def test_replica_routing(
+    test_app: Flask, client: ExtendedClient, db_location: str, tmp_path: Path
+):
+    """Safe requests read from replicas, unless the client just wrote"""
+    from app.apis.v1.roles.models import Role
+    from app.database import REPLICA_STICKY_COOKIE
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        role_id = Role.get(name="admin").id
+    test_app.config["SQLALCHEMY_REPLICAS"] = [make_replica(db_location, tmp_path)]
+
+    def role_names():
+        rv = admin_client.get("/v1/roles/")
+        assert rv.status_code == 200
+        return [role["name"] for role in rv.get_json()["data"]]
+
+    assert "replica" in role_names()
+
+    test_app.config["SESSION_COOKIE_SECURE"] = True
+    rv = admin_client.put(f"/v1/roles/{role_id}", data={"description": "Admins"})
+    assert rv.status_code == 200
+    cookie = rv.headers["Set-Cookie"]
+    assert f"{REPLICA_STICKY_COOKIE}=1" in cookie
+    assert "Secure" in cookie
+    assert "HttpOnly" in cookie
+    assert "SameSite=Lax" in cookie
+    assert "replica" not in role_names()
+
+    admin_client.delete_cookie("localhost", REPLICA_STICKY_COOKIE)
+    assert "replica" in role_names()
+
+
+def test_replica_session_stickiness(
+    test_app: Flask, client: ExtendedClient, db_location: str, tmp_path: Path
+):
+    """A session reads from the primary once it wrote"""
+    from app.apis.v1.roles.models import Role
+
+    with test_app.app_context():
+        client()
+    test_app.config["SQLALCHEMY_REPLICAS"] = [make_replica(db_location, tmp_path)]
+
+    with test_app.test_request_context("/v1/roles/", method="GET"):
+        assert Role.get(name="replica") is not None
+        Role("new", "New role").save()
+        assert Role.get(name="replica") is None
+        assert Role.get(name="new") is not None
+
+    with test_app.test_request_context("/v1/roles/", method="POST"):
+        assert Role.get(name="replica") is None
+
+
+def test_replica_writes(
+    test_app: Flask, client: ExtendedClient, db_location: str, tmp_path: Path
+):
+    """Only DML statements and flushes mark a write"""
+    from flask import g
+
+    from app.apis.v1.roles.models import Role
+    from app.database import db
+
+    with test_app.app_context():
+        client()
+    test_app.config["SQLALCHEMY_REPLICAS"] = [make_replica(db_location, tmp_path)]
+
+    with test_app.test_request_context("/v1/roles/", method="GET"):
+        db.session.execute(text("SELECT name FROM roles"))
+        assert not g.get("_db_wrote")
+        names = db.session.execute(lambda_stmt(lambda: select(Role.name))).scalars()
+        assert "replica" in names.all()
+        assert not db.session.info.get("wrote")
+        db.session.execute(
+            update(Role).where(Role.name == "admin").values(description="Admins")
+        )
+        assert g._db_wrote
+        assert db.session.info["wrote"]
+        db.session.rollback()
+
+
+def test_replica_fallback(
+    test_app: Flask, client: ExtendedClient, db_location: str, tmp_path: Path
+):
+    """Failing replicas are skipped, reads fall back to the primary"""
+    from app.apis.v1.roles.models import Role
+
+    with test_app.app_context():
+        client()
+    broken = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+    test_app.config["SQLALCHEMY_REPLICAS"] = [broken]
+    replicas = test_app.extensions["replicas"]
+
+    with test_app.test_request_context("/v1/roles/", method="GET"):
+        assert Role.get(name="admin") is not None
+    assert broken in replicas.down_until
+    assert broken not in replicas.available()
+
+    test_app.config["SQLALCHEMY_REPLICAS"] = [
+        broken,
+        make_replica(db_location, tmp_path),
+    ]
+    with test_app.test_request_context("/v1/roles/", method="GET"):
+        assert Role.get(name="replica") is not None
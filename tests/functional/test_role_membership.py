@@ -0,0 +1,113 @@
+from flask import Flask
+
+from tests.helpers import ExtendedClient, UserDict, count_statements
+
+
+def test_role_membership(test_app: Flask, client: ExtendedClient, site_user: UserDict):
+    """Members are added, removed and replaced in bulk with per-id results"""
+    from app.apis.v1.roles.models import Role
+    from app.apis.v1.users.models import User, UserRoles
+    from app.database import db
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        role = Role.get(name="user")
+        users = [
+            User(f"member{i}", "pwd", "pwd", first_name="member") for i in range(3)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        site_user_id = User.get(username=site_user["username"]).id
+        ids = [user.id for user in users]
+
+        def members():
+            return sorted(
+                user_id
+                for user_id, in db.session.query(UserRoles.user_id).filter(
+                    UserRoles.role_id == role.id
+                )
+            )
+
+        rv = admin_client.post(
+            f"/v1/roles/{role.id}/users", json={"users": [ids[0], site_user_id, 999]}
+        )
+        assert rv.status_code == 200, rv.get_json()
+        assert rv.get_json()["results"] == [
+            {"id": ids[0], "status": "added"},
+            {"id": site_user_id, "status": "exists"},
+            {"id": 999, "status": "not_found"},
+        ]
+        assert members() == sorted([ids[0], site_user_id])
+
+        rv = admin_client.delete(
+            f"/v1/roles/{role.id}/users", json={"users": [ids[0], ids[1]]}
+        )
+        assert rv.get_json()["results"] == [
+            {"id": ids[0], "status": "removed"},
+            {"id": ids[1], "status": "not_member"},
+        ]
+        assert members() == [site_user_id]
+
+        rv = admin_client.put(f"/v1/roles/{role.id}/users", json={"users": ids})
+        statuses = {
+            result["id"]: result["status"] for result in rv.get_json()["results"]
+        }
+        assert statuses == {
+            ids[0]: "added",
+            ids[1]: "added",
+            ids[2]: "added",
+            site_user_id: "removed",
+        }
+        assert members() == sorted(ids)
+
+        # adding existing members through the role endpoint doesn't duplicate them
+        rv = admin_client.post(f"/v1/roles/{role.id}", json={"users": ids})
+        assert rv.status_code == 200
+        assert members() == sorted(ids)
+        rv = admin_client.post(f"/v1/roles/{role.id}", json={"users": [999]})
+        assert rv.status_code == 401
+        assert members() == sorted(ids)
+
+
+def test_roles_list_statements(test_app: Flask, client: ExtendedClient):
+    """Roles' members are loaded in one query whatever the roles count"""
+    from app.apis.v1.roles.models import Role
+    from app.apis.v1.users.models import User
+    from app.database import db
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        users = [User(f"member{i}", "pwd", "pwd", first_name="m") for i in range(3)]
+        roles = [Role(f"role{i}", f"Role {i}") for i in range(20)]
+        db.session.add_all(users + roles)
+        db.session.flush()
+        for user in users:
+            user.add_roles(roles)
+        db.session.commit()
+        # warm the identity cache
+        admin_client.get("/v1/roles/")
+
+        with count_statements() as without_users:
+            rv = admin_client.get("/v1/roles/?include=none")
+        assert len(rv.get_json()["data"]) == 22
+        assert "users" not in rv.get_json()["data"][0]
+
+        with count_statements() as with_users:
+            rv = admin_client.get("/v1/roles/")
+        assert rv.get_json() == admin_client.get("/v1/roles/?include=users").get_json()
+        data = {role["name"]: role for role in rv.get_json()["data"]}
+        assert data["role0"]["users"] == [
+            {"id": user.id, "username": user.username} for user in users
+        ]
+        assert data["admin"]["users"] == [{"id": 1, "username": "admin_user"}]
+        assert len(with_users) == len(without_users) + 1
+
+        rv = admin_client.get(f"/v1/roles/{roles[0].id}/users?limit=2")
+        page = rv.get_json()
+        assert page["count"] == 3
+        assert [user["username"] for user in page["data"]] == ["member0", "member1"]
+        rv = admin_client.get(f"/v1/roles/{roles[0].id}/users?limit=2&after=")
+        rv = admin_client.get(
+            f"/v1/roles/{roles[0].id}/users?limit=2&after={rv.get_json()['next']}"
+        )
+        assert [user["username"] for user in rv.get_json()["data"]] == ["member2"]
@@ -0,0 +1,111 @@
+from typing import List, Tuple
+
+from flask import Flask
+
+from tests.helpers import (
+    ExtendedClient,
+    UserDict,
+    add_sessions,
+    count_statements,
+    create_user,
+)
+
+
+def test_revoke_sessions(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    """Other sessions are revoked with one DELETE, the current one is kept"""
+    from app.apis.v1.users.models import Session, User
+    from app.extensions import identity_cache
+
+    with test_app.app_context():
+        admin_client = client("admin")
+        user_id = User.get(username=admin_user["username"]).id
+        token = Session.query.filter(Session.user_id == user_id).one().token
+        add_sessions(user_id, 200)
+        revoked_token = Session.query.filter(Session.token != token).first().token
+        identity_cache.store(revoked_token, User.get(id=user_id))
+        assert identity_cache.get(revoked_token) is not None
+
+        with count_statements() as statements:
+            rv = admin_client.delete(f"/v1/users/{user_id}/sessions")
+        assert rv.status_code == 200
+        assert rv.get_json()["count"] == 1
+        assert Session.query.filter(Session.user_id == user_id).one().token == token
+        deletes = [stmt for stmt in statements if stmt.startswith("DELETE")]
+        assert len(deletes) == 1
+        assert identity_cache.get(revoked_token) is None
+
+
+def test_revoke_many_users(
+    test_app: Flask, client: ExtendedClient, site_user: UserDict
+):
+    """Sessions of many users are revoked at once & receivers are notified"""
+    from app.apis.v1.users.models import Session, User, sessions_revoked
+
+    received: List[Tuple[int, str]] = []
+
+    def on_revoked(sender: Flask, revoked: List[Tuple[int, str]]):
+        received.extend(revoked)
+
+    with test_app.app_context():
+        client()
+        usernames = [site_user["username"], "user0", "user1"]
+        for username in usernames[1:]:
+            create_user(
+                {**site_user, "username": username, "email": f"{username}@example.com"}
+            )
+        user_ids = [User.get(username=username).id for username in usernames]
+        for user_id in user_ids:
+            add_sessions(user_id, 3)
+        add_sessions(user_ids[0] - 1, 2)
+
+        with sessions_revoked.connected_to(on_revoked, test_app):
+            revoked = Session.revoke(user_ids[1:])
+            assert sorted(revoked) == sorted(received)
+            assert {user_id for user_id, _ in revoked} == set(user_ids[1:])
+            assert len(revoked) == 6
+
+        rv = test_app.test_cli_runner().invoke(
+            args=["sessions-revoke", str(user_ids[0])]
+        )
+        assert "Revoked 3 sessions" in rv.output
+        rv = test_app.test_cli_runner().invoke(args=["sessions-revoke", "--all"])
+        assert "Revoked 2 sessions" in rv.output
+        rv = test_app.test_cli_runner().invoke(args=["sessions-revoke"])
+        assert rv.exit_code != 0
+
+
+def test_revoke_in_unit_of_work(test_app: Flask, client: ExtendedClient):
+    """Caches & receivers learn about revocations once they're committed"""
+    from app.apis.v1.users.models import Session, User, sessions_revoked
+    from app.database import unit_of_work
+    from app.extensions import identity_cache
+
+    received: List[Tuple[int, str]] = []
+
+    def on_revoked(sender: Flask, revoked: List[Tuple[int, str]]):
+        received.extend(revoked)
+
+    with test_app.app_context():
+        client()
+        user = User.query.first()
+        add_sessions(user.id, 1)
+        token = Session.query.filter(Session.user_id == user.id).one().token
+
+        with sessions_revoked.connected_to(on_revoked, test_app):
+            identity_cache.store(token, User.get(id=user.id))
+            try:
+                with unit_of_work():
+                    assert Session.revoke(user.id) == [(user.id, token)]
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            assert identity_cache.get(token) is not None
+            assert not received
+            assert Session.query.filter(Session.token == token).count() == 1
+
+            with unit_of_work():
+                Session.revoke(user.id)
+                assert identity_cache.get(token) is not None
+                assert not received
+            assert identity_cache.get(token) is None
+            assert received == [(user.id, token)]
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import pytz
+from flask import Flask
+
+from app.utils.partitions import month_start, naive_utc, partition_name
+from tests.helpers import ExtendedClient, UserDict, add_sessions
+
+
+def test_prune_expired(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    """Expired sessions are deleted in batches and can't authenticate"""
+    from app.apis.v1.users.models import Session, User
+    from app.database import db
+
+    with test_app.app_context():
+        client("admin")
+        user_id = User.get(username=admin_user["username"]).id
+        token = Session.query.filter(Session.user_id == user_id).one().token
+        add_sessions(user_id, 5, expires_in=timedelta(days=-1))
+        add_sessions(user_id, 3)
+        assert User.get_by_session(token, user_id) is not None
+
+        assert Session.prune_expired(batch_size=2) == 2
+        rv = test_app.test_cli_runner().invoke(
+            args=["sessions-prune", "--batch-size", "2"]
+        )
+        assert rv.exit_code == 0, rv.output
+        assert "Deleted 3 expired sessions" in rv.output
+        # the logged in session and the unexpired ones are kept
+        assert Session.query.filter(Session.user_id == user_id).count() == 4
+
+        Session.query.filter(Session.token == token).update(
+            {"expires_at": datetime.now(tz=pytz.UTC) - timedelta(minutes=1)}
+        )
+        db.session.commit()
+        assert User.get_by_session(token, user_id) is None
+
+
+def test_sessions_partition_requires_postgresql(test_app: Flask):
+    with test_app.app_context():
+        rv = test_app.test_cli_runner().invoke(args=["sessions-partition"])
+    assert rv.exit_code != 0
+    assert "requires PostgreSQL" in rv.output
+
+
+def test_month_bounds():
+    value = datetime(2026, 12, 31, 23, 30, tzinfo=timezone(timedelta(hours=3)))
+    assert naive_utc(value) == datetime(2026, 12, 31, 20, 30)
+    assert month_start(datetime(2026, 12, 15, 8), 1) == datetime(2027, 1, 1)
+    assert month_start(datetime(2026, 1, 15), -1) == datetime(2025, 12, 1)
+    assert partition_name("sessions", datetime(2027, 1, 1)) == "sessions_p2027_01"
+
+
+def test_copy_rows(test_app: Flask, client: ExtendedClient, admin_user: UserDict):
+    """Rows are copied by column names, whatever the source's column order"""
+    from sqlalchemy import text
+
+    from app.apis.v1.users.models import Session, User
+    from app.database import db
+    from app.utils.partitions import copy_rows
+
+    with test_app.app_context():
+        client("admin")
+        add_sessions(User.get(username=admin_user["username"]).id, 3)
+        columns = [column.name for column in Session.__table__.columns]
+        rows = db.session.execute(text("SELECT * FROM sessions ORDER BY id")).all()
+        db.session.execute(
+            text(
+                f"CREATE TABLE sessions_copy AS SELECT {', '.join(columns[::-1])}"
+                " FROM sessions"
+            )
+        )
+        db.session.execute(text("DELETE FROM sessions"))
+
+        assert copy_rows("sessions_copy", Session.__table__) == len(rows) == 4
+        copied = db.session.execute(text("SELECT * FROM sessions ORDER BY id")).all()
+        assert copied == rows
+        db.session.rollback()
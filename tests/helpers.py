@@ -1,9 +1,16 @@
-from typing import Any, List, TypedDict
+import io
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Iterator, List, Tuple, TypedDict
 
+import pytz
 from flask.testing import FlaskClient
+from PIL import Image
+from sqlalchemy import event
 
 from app.apis.v1.roles.models import Role
-from app.apis.v1.users.models import User
+from app.apis.v1.users.models import Session, User
 from app.database import db
 
 
@@ -46,6 +53,31 @@ def create_user(user_info: UserDict):
     db.session.commit()
 
 
+def add_sessions(
+    user_id: int, count: int, expires_in: timedelta = timedelta(days=7)
+) -> None:
+    """Bulk inserts sessions for user, expiring after expires_in"""
+    now = datetime.now(tz=pytz.UTC)
+    db.session.execute(
+        Session.__table__.insert(),
+        [
+            {
+                "user_id": user_id,
+                "token": uuid.uuid4().hex,
+                "ip_address": "127.0.0.1",
+                "platform": "linux",
+                "browser": "firefox",
+                "active": True,
+                "slug": str(uuid.uuid4()),
+                "created_at": now,
+                "expires_at": now + expires_in,
+            }
+            for _ in range(count)
+        ],
+    )
+    db.session.commit()
+
+
 class ExtendedClient(FlaskClient):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         csrf = kwargs.pop("csrf")
@@ -55,3 +87,42 @@ class ExtendedClient(FlaskClient):
     def open(self, *args, **kw):
         kw["headers"] = {**kw.get("headers", {}), **{"X-CSRF-TOKEN": self.csrf}}
         return super(ExtendedClient, self).open(*args, **kw)
+
+
+def png_image(color: str = "red", size: Tuple[int, int] = (300, 200)) -> bytes:
+    """Returns a solid color png image's content"""
+    content = io.BytesIO()
+    Image.new("RGB", size, color).save(content, "PNG")
+    return content.getvalue()
+
+
+@contextmanager
+def count_statements() -> Iterator[List[str]]:
+    """Collects statements executed on the app's engine within the block"""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_engine()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def count_commits() -> Iterator[List[None]]:
+    """Collects the transactions committed on the app's engine within the block"""
+    commits: List[None] = []
+
+    def commit(conn):
+        commits.append(None)
+
+    engine = db.get_engine()
+    event.listen(engine, "commit", commit)
+    try:
+        yield commits
+    finally:
+        event.remove(engine, "commit", commit)
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy.sql.expression import and_, or_
+
+from app.exceptions import InvalidUsage
+from tests.helpers import count_commits, count_statements
+
+
+def test_unit_of_work(test_app: Flask):
+    """Helpers only flush within a unit of work, committed once on exit"""
+    from app.apis.v1.roles.models import Role
+    from app.database import db, unit_of_work
+
+    with test_app.app_context():
+        db.create_all()
+        with count_commits() as commits:
+            with unit_of_work():
+                for index in range(5):
+                    Role(f"role{index}", "role").save()
+                with unit_of_work():
+                    Role.get(name="role0").update(description="first role")
+                Role.get(name="role1").delete(True)
+                assert not commits
+        assert len(commits) == 1
+        assert Role.query.count() == 4
+        assert Role.get(name="role0").description == "first role"
+
+        with count_commits() as commits:
+            for index in range(5, 8):
+                Role(f"role{index}", "role").save()
+        assert len(commits) == 3
+
+
+def test_unit_of_work_rollback(test_app: Flask):
+    """Raising within a unit of work rolls back all of its changes"""
+    from app.apis.v1.roles.models import Role
+    from app.database import db, unit_of_work
+
+    @unit_of_work()
+    def add_roles(fail: bool):
+        Role("kept", "role").save()
+        if fail:
+            raise InvalidUsage.user_not_authorized()
+
+    with test_app.app_context():
+        db.create_all()
+        with pytest.raises(InvalidUsage):
+            add_roles(True)
+        assert Role.query.count() == 0
+        add_roles(False)
+        assert Role.query.count() == 1
+
+
+def test_get(test_app: Flask):
+    """Id lookups hit the identity map, attribute lookups reuse statements"""
+    from app.apis.v1.roles.models import Role
+    from app.database import _get_statement, db
+
+    with test_app.app_context():
+        db.create_all()
+        Role("admin", "Admin role").save()
+        Role("user", "User role").save()
+        role = Role.get(name="admin")
+        hits = _get_statement.cache_info().hits
+
+        with count_statements() as statements:
+            assert Role.get(role.id) is role
+            assert Role.get(id=role.id, name="admin") is role
+            assert Role.get(id=role.id, name="user") is None
+            assert Role.get(description=None) is None
+        assert len(statements) == 3
+        assert "IS NULL" in statements[-1]
+        # the id & name lookups share a statement
+        assert _get_statement.cache_info().hits == hits + 1
+
+
+@pytest.mark.benchmark
+def test_get_benchmark(test_app: Flask, record_property):
+    """Times get against the query it replaced"""
+    from app.apis.v1.roles.models import Role
+    from app.database import db
+
+    def legacy_get(id: int = None, **kwargs):
+        return (
+            db.session.query(Role)
+            .filter(
+                and_(
+                    or_(Role.id == id, id == None),  # noqa: E711
+                    *[getattr(Role, arg) == val for arg, val in kwargs.items()],
+                )
+            )
+            .one_or_none()
+        )
+
+    with test_app.app_context():
+        db.create_all()
+        Role("admin", "Admin role").save()
+        role = Role.get(name="admin")
+        for name, get in [("legacy", legacy_get), ("cached", Role.get)]:
+            start = time.perf_counter()
+            for _ in range(500):
+                get(role.id)
+                get(name="admin")
+            record_property(f"{name}_ms", (time.perf_counter() - start) * 1000)
@@ -0,0 +1,35 @@
+import time
+
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_expiry():
+    """Entries are served until their ttl passes"""
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_ttl_cache_lru_eviction():
+    """Least recently used entry is evicted once the cache is full"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_disabled():
+    cache = TTLCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+
+    assert not cache.enabled
+    assert cache.get("a") is None
@@ -1,7 +1,9 @@
+import time
+
 import pytest
 from app.exceptions import InvalidUsage
 from app.utils import g
-from app.utils.decorators import check_roles, has_roles
+from app.utils.decorators import check_roles, compile_roles, has_roles, identity_roles
 from flask import Flask
 from flask_principal import Identity, Permission, RoleNeed
 
@@ -71,3 +73,68 @@ def test_has_roles(test_app: Flask, admin_role: RoleNeed):
             assert isinstance(e, InvalidUsage)
             assert e.status_code == 401
             assert e.errors[0] == "Unauthorized access"
+
+
+def test_compile_roles():
+    """Compiled role expressions require a list's roles and any of a nested list's"""
+    assert compile_roles(["admin"])(frozenset({"admin", "user"}))
+    assert not compile_roles(["admin", "user"])(frozenset({"admin"}))
+    assert compile_roles(["admin", ["user", "test"]])(frozenset({"admin", "test"}))
+    assert not compile_roles(["admin", ["user", "test"]])(frozenset({"user"}))
+    assert not compile_roles([])(frozenset({"admin"}))
+    assert not compile_roles([[]])(frozenset({"admin"}))
+
+    # nesting alternates between all and any of the roles
+    allows = compile_roles([["admin", ["editor", "reviewer"]]])
+    assert allows(frozenset({"admin"}))
+    assert allows(frozenset({"editor", "reviewer"}))
+    assert not allows(frozenset({"editor"}))
+
+
+def test_identity_roles(admin_role: RoleNeed):
+    """Role names are read from the identity's needs unless already set"""
+    test_identity = Identity(1)
+    test_identity.provides.add(admin_role)
+
+    assert identity_roles(test_identity) == frozenset({"admin"})
+
+    test_identity.roles = frozenset({"user"})
+    assert identity_roles(test_identity) == frozenset({"user"})
+
+
+@pytest.mark.benchmark
+def test_has_roles_overhead(record_property):
+    """Compares role checks of a deep expression against Permission based ones"""
+    roles = ["user", ["admin", "editor"], ["reviewer", "publisher", "auditor"]]
+    test_identity = Identity(1)
+    for role in ["user", "auditor", "editor", "test"]:
+        test_identity.provides.add(RoleNeed(role))
+    permissions = [
+        Permission(RoleNeed(role))
+        if not isinstance(role, list)
+        else [Permission(RoleNeed(role_)) for role_ in role]
+        for role in roles
+    ]
+    allows = compile_roles(roles)
+    calls = 10000
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        assert check_roles(test_identity, permissions)
+    permission_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        assert allows(identity_roles(test_identity))
+    compiled_elapsed = time.perf_counter() - start
+
+    # as loaded by the jwt user loader, with role names from the identity cache
+    test_identity.roles = identity_roles(test_identity)
+    start = time.perf_counter()
+    for _ in range(calls):
+        assert allows(identity_roles(test_identity))
+    cached_elapsed = time.perf_counter() - start
+
+    record_property("permissions_us", permission_elapsed / calls * 1e6)
+    record_property("compiled_us", compiled_elapsed / calls * 1e6)
+    record_property("cached_roles_us", cached_elapsed / calls * 1e6)
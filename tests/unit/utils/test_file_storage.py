@@ -0,0 +1,320 @@
+import io
+import os
+import time
+from unittest import mock
+
+import pytest
+from botocore.exceptions import ClientError
+from flask import Flask
+
+from app.utils.file_storage import FileStorage, s3, s3_client, storage_handlers
+from tests.helpers import png_image
+
+
+@pytest.fixture()
+def boto3_mock(test_app: Flask):
+    s3._s3_clients.clear()
+    with test_app.app_context(), mock.patch.object(s3, "boto3") as boto3:
+        client = boto3.session.Session.return_value.client.return_value
+        client.head_object.side_effect = ClientError(
+            {"Error": {"Code": "404"}}, "HeadObject"
+        )
+        yield boto3
+    s3._s3_clients.clear()
+
+
+def test_shared_s3_client(boto3_mock: mock.MagicMock):
+    """Handlers share one S3 client per process"""
+    for name in ["a.png", "b.png"]:
+        FileStorage(data=io.BytesIO(b"data"), name=name).save()
+
+    assert boto3_mock.session.Session.call_count == 1
+    client = s3_client()
+    assert client.upload_fileobj.call_count == 2
+
+    s3._s3_clients_pid = -1
+    assert s3_client() is client
+    assert boto3_mock.session.Session.call_count == 2
+
+
+def test_url_handler_skips_s3(boto3_mock: mock.MagicMock):
+    """Formatting a stored file's url doesn't create S3 clients"""
+    url = "http://s3-region.example.com/bucket/abc123avatar.png"
+
+    assert FileStorage(url=url).url == url
+    assert boto3_mock.session.Session.call_count == 0
+
+
+def test_marshal_users_skips_s3(boto3_mock: mock.MagicMock):
+    """Serializing users' photos never creates storage handlers"""
+    from flask_restx import marshal
+
+    from app.apis.v1.users.models import User
+    from app.apis.v1.users.resources import user_model
+
+    users = []
+    for i in range(10):
+        user = User(f"user{i}", "pwd", "pwd", first_name="user")
+        user._photo = f"http://s3-region.example.com/bucket/{i}avatar.png"
+        users.append(user)
+
+    handler = mock.MagicMock()
+    with mock.patch.dict(storage_handlers, {"s3": handler}):
+        data = marshal(users, user_model)
+
+    assert [user["photo"] for user in data] == [user._photo for user in users]
+    assert handler.call_count == 0
+    assert boto3_mock.mock_calls == []
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 24
+IMAGE = png_image()
+
+
+def test_upload_stream_limits(test_app: Flask):
+    """Uploads are sniffed from their first bytes and cut off past the limit"""
+    from app.exceptions import InvalidUsage
+    from app.utils.file_storage import IMAGE_CONTENT_TYPES, UploadStream
+
+    stream = UploadStream(io.BytesIO(PNG + b"\x00" * 68), 100, IMAGE_CONTENT_TYPES)
+    assert stream.content_type == "image/png"
+    assert stream.read(10) == PNG[:10]
+    assert len(stream.read()) == 90
+
+    stream = UploadStream(io.BytesIO(PNG + b"\x00" * 100), 100)
+    with pytest.raises(InvalidUsage) as e:
+        while stream.read(16):
+            pass
+    assert e.value.status_code == 400
+    assert stream.size <= 100 + 16
+
+    with pytest.raises(InvalidUsage) as e:
+        UploadStream(io.BytesIO(b"plain text"), 100, IMAGE_CONTENT_TYPES)
+    assert e.value.status_code == 415
+
+
+def test_photo_upload(test_app: Flask, client, admin_user, boto3_mock: mock.MagicMock):
+    """Photos are streamed to S3 with sniffed content type and multipart config"""
+    from app.apis.v1.users.models import User
+
+    admin_client = client("admin")
+    user = User.get(username=admin_user["username"])
+    test_app.config["MAX_UPLOAD_SIZE"] = 1024
+
+    rv = admin_client.put(
+        f"/v1/users/{user.id}",
+        data={"photo": (io.BytesIO(IMAGE), "avatar.png")},
+        content_type="multipart/form-data",
+    )
+    assert rv.status_code == 200, rv.get_json()
+    # the original and its variants
+    assert s3_client().upload_fileobj.call_count == 3
+    _, kwargs = s3_client().upload_fileobj.call_args
+    assert kwargs["ExtraArgs"]["ContentType"] == "image/png"
+    assert (
+        kwargs["Config"].multipart_chunksize
+        == test_app.config["S3_MULTIPART_CHUNKSIZE"]
+    )
+
+    rv = admin_client.put(
+        f"/v1/users/{user.id}",
+        data={"photo": (io.BytesIO(b"text"), "avatar.png")},
+        content_type="multipart/form-data",
+    )
+    assert rv.status_code == 415
+
+    test_app.config["MAX_CONTENT_LENGTH"] = 1024
+    rv = admin_client.put(
+        f"/v1/users/{user.id}",
+        data={"photo": (io.BytesIO(PNG * 100), "avatar.png")},
+        content_type="multipart/form-data",
+    )
+    assert rv.status_code == 400
+    assert rv.get_json()["errors"] == ["File size is larger than 1KB"]
+
+
+@pytest.fixture()
+def storage_queue(test_app: Flask, tmp_path):
+    test_app.config["STORAGE_QUEUE"] = True
+    test_app.config["STORAGE_QUEUE_DIR"] = str(tmp_path)
+    # a job per file
+    test_app.config["IMAGE_VARIANTS"] = {}
+    return tmp_path
+
+
+def test_queued_photo_upload(
+    test_app: Flask, client, admin_user, boto3_mock: mock.MagicMock, storage_queue
+):
+    """Queued uploads are staged locally and uploaded by the worker"""
+    from app.apis.v1.users.models import User
+    from app.database import db
+    from app.utils.file_storage import StorageJob, process_jobs
+
+    admin_client = client("admin")
+    user = User.get(username=admin_user["username"])
+
+    rv = admin_client.put(
+        f"/v1/users/{user.id}",
+        data={"photo": (io.BytesIO(IMAGE), "avatar.png")},
+        content_type="multipart/form-data",
+    )
+    assert rv.status_code == 200, rv.get_json()
+    assert boto3_mock.mock_calls == []
+    job = StorageJob.query.one()
+    assert rv.get_json()["photo"] == job.url
+    assert job.status == "pending"
+    with open(job.staged_path, "rb") as fp:
+        assert fp.read() == IMAGE
+
+    upload = s3_client().upload_fileobj
+    upload.side_effect = ConnectionError("unreachable")
+    assert process_jobs() == 1
+    db.session.refresh(job)
+    assert (job.status, job.attempts) == ("pending", 1)
+    assert "unreachable" in job.last_error
+    # not due before its backoff
+    assert process_jobs() == 0
+
+    upload.side_effect = None
+    job.run_at = job.created_at
+    db.session.commit()
+    assert process_jobs() == 1
+    db.session.refresh(job)
+    assert (job.status, job.attempts) == ("done", 2)
+    _, kwargs = upload.call_args
+    assert kwargs["ExtraArgs"]["ContentType"] == "image/png"
+    assert upload.call_args[0][2] == job.url.split("/")[-1]
+    assert list(storage_queue.iterdir()) == []
+
+
+def test_queued_delete(
+    test_app: Flask, client, boto3_mock: mock.MagicMock, storage_queue
+):
+    """Deletes are queued once per file and cancel pending uploads"""
+    from app.database import db
+    from app.utils.file_storage import StorageJob, process_jobs
+
+    client()
+    s3_client().head_object.side_effect = None
+    s3_client().head_object.return_value = {"ContentLength": len(PNG)}
+    photo = FileStorage(data=io.BytesIO(PNG), name="avatar.png")
+    photo.save()
+    db.session.commit()
+    for _ in range(2):
+        FileStorage(url=photo.url).delete()
+    db.session.commit()
+
+    assert [job.operation for job in StorageJob.query.order_by("id")] == [
+        "save",
+        "delete",
+    ]
+    # both were due, the upload ran before the delete
+    assert process_jobs() == 2
+    assert s3_client().upload_fileobj.call_count == 1
+    assert s3_client().delete_object.call_count == 1
+
+    photo = FileStorage(data=io.BytesIO(PNG + b"1"), name="avatar.png")
+    photo.save()
+    FileStorage(url=photo.url).delete()
+    db.session.commit()
+    save = StorageJob.query.filter(StorageJob.key == f"save:{photo.url}").one()
+    save.run_at = save.run_at.replace(year=save.run_at.year + 1)
+    db.session.commit()
+
+    assert process_jobs() == 1
+    db.session.refresh(save)
+    assert save.status == "cancelled"
+    assert s3_client().upload_fileobj.call_count == 1
+
+    # uploads cancelled while running are removed again
+    photo = FileStorage(data=io.BytesIO(PNG + b"2"), name="avatar.png")
+    photo.save()
+    db.session.commit()
+
+    def cancel(*args, **kwargs):
+        StorageJob.query.filter(StorageJob.url == photo.url).update(
+            {"status": "cancelled"}
+        )
+
+    s3_client().upload_fileobj.side_effect = cancel
+    assert process_jobs() == 1
+    assert s3_client().upload_fileobj.call_count == 2
+    assert s3_client().delete_object.call_count == 3
+    assert list(storage_queue.iterdir()) == []
+
+
+def test_queued_reupload(
+    test_app: Flask, client, boto3_mock: mock.MagicMock, storage_queue
+):
+    """Storing a file again cancels its pending delete"""
+    from app.database import db
+    from app.utils.file_storage import StorageJob, process_jobs
+    from app.utils.file_storage.jobs import claim_jobs
+
+    client()
+    photo = FileStorage(data=io.BytesIO(PNG), name="avatar.png")
+    photo.save()
+    db.session.commit()
+    assert process_jobs() == 1
+
+    FileStorage(url=photo.url).delete()
+    db.session.commit()
+    FileStorage(data=io.BytesIO(PNG), name="avatar.png").save()
+    db.session.commit()
+
+    delete = StorageJob.query.filter(StorageJob.key == f"delete:{photo.url}").one()
+    assert delete.status == "cancelled"
+    assert process_jobs() == 1
+    assert s3_client().upload_fileobj.call_count == 2
+    assert s3_client().delete_object.call_count == 0
+
+    # a delete already claimed by a worker leaves the new upload alone
+    FileStorage(url=photo.url).delete()
+    db.session.commit()
+    (delete,) = claim_jobs(10)
+    FileStorage(data=io.BytesIO(PNG), name="avatar.png").save()
+    db.session.commit()
+    delete.run()
+    db.session.commit()
+    assert s3_client().delete_object.call_count == 0
+    assert process_jobs() == 1
+    assert s3_client().upload_fileobj.call_count == 3
+    assert list(storage_queue.iterdir()) == []
+
+
+def test_staged_files_cleanup(
+    test_app: Flask, client, boto3_mock: mock.MagicMock, storage_queue
+):
+    """Failed jobs and idle workers remove staged files"""
+    from app.database import db
+    from app.utils.file_storage import StorageJob, process_jobs
+
+    client()
+    test_app.config["STORAGE_QUEUE_MAX_ATTEMPTS"] = 1
+    s3_client().upload_fileobj.side_effect = ConnectionError("unreachable")
+    FileStorage(data=io.BytesIO(PNG), name="avatar.png").save()
+    db.session.commit()
+    assert process_jobs() == 1
+    job = StorageJob.query.one()
+    assert (job.status, job.staged_path) == ("failed", None)
+    assert list(storage_queue.iterdir()) == []
+
+    FileStorage(data=io.BytesIO(PNG + b"1"), name="avatar.png").save()
+    db.session.commit()
+    pending = StorageJob.query.filter(StorageJob.status == "pending").one()
+    pending.run_at = pending.run_at.replace(year=pending.run_at.year + 1)
+    db.session.commit()
+    staged = os.path.basename(pending.staged_path)
+    # staged by a request that rolled back, a while ago and just now
+    orphan, recent = storage_queue / "orphan", storage_queue / "recent"
+    orphan.write_bytes(PNG)
+    recent.write_bytes(PNG)
+    day_ago = time.time() - 24 * 3600
+    for path in [orphan, storage_queue / staged]:
+        os.utime(path, (day_ago, day_ago))
+
+    rv = test_app.test_cli_runner().invoke(args=["storage-worker", "--once"])
+    assert rv.exit_code == 0, rv.output
+    assert sorted(path.name for path in storage_queue.iterdir()) == sorted(
+        ["recent", staged]
+    )
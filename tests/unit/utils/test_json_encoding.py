@@ -0,0 +1,85 @@
+import json
+import time
+from datetime import date, datetime
+from unittest import mock
+
+import pytest
+import pytz
+from flask import Flask
+from flask_restx import fields
+
+from app.utils import json_encoding
+from app.utils.json_encoding import dumps, json_response
+
+VALUES = {
+    "createdAt": datetime(2021, 5, 1, 12, 30, 15, 120, tzinfo=pytz.UTC),
+    "naive": datetime(2021, 5, 1, 12, 30),
+    "day": date(2021, 5, 1),
+    1: "non string key",
+}
+
+
+@pytest.mark.parametrize("encoder", ["orjson", "stdlib"])
+def test_dumps(test_app: Flask, encoder: str):
+    """Both encoders encode dates as restx's DateTime field formats them"""
+    test_app.config["JSON_ENCODER"] = encoder
+    with test_app.app_context():
+        assert json_encoding.use_orjson() == (encoder == "orjson")
+        decoded = json.loads(dumps(VALUES))
+    assert decoded == {
+        "createdAt": fields.DateTime().format(VALUES["createdAt"]),
+        "naive": fields.DateTime().format(VALUES["naive"]),
+        "day": "2021-05-01",
+        "1": "non string key",
+    }
+
+
+def test_dumps_fallback(test_app: Flask):
+    """Responses are encoded by the stdlib when orjson isn't installed"""
+    with test_app.app_context(), mock.patch.object(json_encoding, "orjson", None):
+        assert not json_encoding.use_orjson()
+        response = json_response({"errors": ["Not found"]}, 404)
+    assert response.status_code == 404
+    assert response.get_json() == {"errors": ["Not found"]}
+
+
+def session_page() -> dict:
+    """A page of 1k marshalled sessions"""
+    session = {
+        "id": 1,
+        "ipAddress": "127.0.0.1",
+        "platform": "linux",
+        "browser": "firefox",
+        "createdAt": datetime.now(tz=pytz.UTC).isoformat(),
+        "active": False,
+        "url": "/v1/users/1/sessions/0b7f7c0e-7d3c-4bd4-9a39-3c5a7e8e2f6d",
+    }
+    return {
+        "count": 1000,
+        "limit": 1000,
+        "offset": 0,
+        "next": None,
+        "data": [{**session, "id": index} for index in range(1000)],
+    }
+
+
+@pytest.mark.parametrize("encoder", ["orjson", "stdlib"])
+def test_session_list_encoding(test_app: Flask, encoder: str):
+    """Both encoders round trip a page of sessions"""
+    data = session_page()
+    test_app.config["JSON_ENCODER"] = encoder
+    with test_app.app_context():
+        assert json.loads(dumps(data)) == data
+
+
+@pytest.mark.benchmark
+def test_session_list_encoding_benchmark(test_app: Flask, record_property):
+    """Times encoding a page of 1k marshalled sessions"""
+    data = session_page()
+    with test_app.app_context():
+        for encoder in ["stdlib", "orjson"]:
+            test_app.config["JSON_ENCODER"] = encoder
+            start = time.perf_counter()
+            for _ in range(20):
+                dumps(data)
+            record_property(f"{encoder}_ms", (time.perf_counter() - start) / 20 * 1000)
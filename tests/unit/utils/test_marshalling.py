@@ -0,0 +1,132 @@
+import time
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import create_access_token, get_jti, verify_jwt_in_request
+from flask_restx import fields
+from flask_restx import marshal as restx_marshal
+
+from app.utils.marshalling import compile_fields, marshal
+from tests.helpers import ExtendedClient, UserDict, create_user
+
+DIGEST = "ab" * 32
+
+
+def test_compile_fields():
+    """Compiled fields output what restx does for plain values"""
+    model = {
+        "id": fields.Integer,
+        "name": fields.String(attribute="info.name", default="N/A"),
+        "tags": fields.List(fields.String),
+        "flag": fields.Boolean,
+        "raw": fields.Raw,
+        "nested": fields.Nested({"a": fields.Integer}, allow_null=True),
+    }
+    rows = [
+        {"id": "1", "info": {"name": "one"}, "tags": ("a", 1), "flag": "true"},
+        {"id": 2, "info": None, "tags": None, "flag": 0, "raw": [1], "nested": {}},
+    ]
+
+    assert marshal(rows, model) == restx_marshal(rows, model)
+    assert marshal(rows, model, envelope="data", skip_none=True) == restx_marshal(
+        rows, model, envelope="data", skip_none=True
+    )
+    assert compile_fields(model) is compile_fields(model)
+    assert compile_fields({"any": fields.Wildcard(fields.String)}) is None
+
+
+def test_golden_serializers(
+    test_app: Flask, client: ExtendedClient, admin_user: UserDict, site_user: UserDict
+):
+    """Compiled user & session serializers match restx's output"""
+    from app.apis.v1.users.models import Session, User
+    from app.apis.v1.users.resources import session_model, user_model
+    from app.database import db
+
+    client("admin")
+    with test_app.app_context():
+        for index in range(40):
+            create_user(
+                {
+                    **site_user,
+                    "username": f"user{index}",
+                    "email": f"user{index}@example.com",
+                    "photo": f"/files/{DIGEST}.png" if index % 2 else None,
+                }
+            )
+        admin = User.get(username=admin_user["username"])
+        token = create_access_token(admin)
+        for index in range(300):
+            db.session.add(
+                Session(
+                    user=admin,
+                    token=get_jti(token) if index == 150 else f"token{index}",
+                    ip_address="127.0.0.1",
+                    platform=None if index % 3 else "linux",
+                    browser="firefox",
+                )
+            )
+        db.session.commit()
+        admin_id = admin.id
+
+    with test_app.test_request_context(
+        f"/v1/users/{admin_id}/sessions",
+        headers={"Authorization": f"Bearer {token}"},
+    ):
+        verify_jwt_in_request()
+        users = User.query.order_by(User.id).all()
+        sessions = Session.query.filter(Session.user_id == admin_id).all()
+
+        golden_sessions = restx_marshal(sessions, session_model)
+        assert marshal(sessions, session_model) == golden_sessions
+        assert [session_["active"] for session_ in golden_sessions].count(True) == 1
+        assert golden_sessions[0]["url"] == (
+            f"/v1/users/{admin_id}/sessions/{sessions[0].slug}"
+        )
+        golden_users = restx_marshal(users, user_model, skip_none=True)
+        assert marshal(users, user_model, skip_none=True) == golden_users
+        golden_user = next(user for user in golden_users if user["username"] == "user1")
+        assert golden_user["photoVariants"]["small"] == f"/files/{DIGEST}-small.png"
+        assert compile_fields(session_model) is not None
+        assert compile_fields(user_model, skip_none=True) is not None
+
+
+@pytest.mark.benchmark
+def test_marshalling_benchmark(
+    test_app: Flask, client: ExtendedClient, admin_user: UserDict, record_property
+):
+    """Times restx's marshal against the compiled one"""
+    from app.apis.v1.users.models import Session, User
+    from app.apis.v1.users.resources import session_model, user_model
+    from app.database import db
+
+    client("admin")
+    with test_app.app_context():
+        admin = User.get(username=admin_user["username"])
+        token = create_access_token(admin)
+        for index in range(300):
+            db.session.add(
+                Session(
+                    user=admin,
+                    token=get_jti(token) if index == 0 else f"token{index}",
+                    ip_address="127.0.0.1",
+                    platform="linux",
+                    browser="firefox",
+                )
+            )
+        db.session.commit()
+        admin_id = admin.id
+
+    with test_app.test_request_context(
+        f"/v1/users/{admin_id}/sessions",
+        headers={"Authorization": f"Bearer {token}"},
+    ):
+        verify_jwt_in_request()
+        users = User.query.order_by(User.id).all()
+        sessions = Session.query.filter(Session.user_id == admin_id).all()
+        for name, marshal_ in [("restx", restx_marshal), ("compiled", marshal)]:
+            start = time.perf_counter()
+            for _ in range(5):
+                marshal_(sessions, session_model)
+                marshal_(users, user_model, skip_none=True)
+            record_property(f"{name}_ms", (time.perf_counter() - start) * 1000 / 5)
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+
+from app.utils.pool import InstrumentedQueuePool
+
+
+def test_pool_metrics(tmp_path):
+    """Checkouts, waits and timeouts are recorded by the pool"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    connection = engine.connect()
+
+    with pytest.raises(TimeoutError):
+        engine.connect()
+    connection.close()
+    engine.connect().close()
+
+    stats = engine.pool.stats()
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 1
+    assert stats["waitMaxMs"] >= 50
+    assert stats["checkedOut"] == 0 and stats["size"] == 1
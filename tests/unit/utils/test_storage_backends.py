@@ -0,0 +1,242 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from flask import Flask
+
+from app.utils.file_storage import (
+    FileStorage,
+    FileStorageInterface,
+    memory_files,
+    register_storage_handler,
+    storage_handlers,
+)
+from tests.helpers import png_image
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 24
+
+
+@pytest.fixture()
+def local_target(test_app: Flask, tmp_path):
+    test_app.config["STORAGE_TARGET"] = "local"
+    test_app.config["STORAGE_LOCAL_ROOT"] = str(tmp_path)
+    with test_app.app_context():
+        yield tmp_path
+
+
+@pytest.fixture()
+def memory_target(test_app: Flask):
+    test_app.config["STORAGE_TARGET"] = "memory"
+    with test_app.app_context():
+        yield memory_files
+    memory_files.clear()
+
+
+def test_local_storage(test_app: Flask, local_target):
+    """Local files are sharded, written atomically and served by /files"""
+    photo = FileStorage(data=io.BytesIO(PNG), name="../my avatar.png", public=True)
+    photo.save()
+
+    shard, subshard, name = photo.url.split("/")[-3:]
+    assert photo.url == f"/files/public/{shard}/{subshard}/{name}"
+    assert (shard, subshard) == (name[:2], name[2:4])
+    assert name == f"{hashlib.sha256(PNG).hexdigest()}.png"
+    assert os.listdir(local_target / "public" / shard / subshard) == [name]
+
+    with test_app.test_client() as client:
+        rv = client.get(photo.url)
+        assert rv.status_code == 200
+        assert rv.data == PNG
+        assert rv.mimetype == "image/png"
+        rv.close()
+
+        test_app.config["STORAGE_LOCAL_ACCEL_REDIRECT"] = "/internal-files/"
+        rv = client.get(photo.url)
+        assert rv.data == b""
+        assert rv.headers["X-Accel-Redirect"] == (
+            f"/internal-files/public/{shard}/{subshard}/{name}"
+        )
+
+    assert FileStorage(url=photo.url).delete()
+    assert not FileStorage(url=photo.url).delete()
+    assert os.listdir(local_target / "public" / shard / subshard) == []
+
+
+def test_private_files(test_app: Flask, client, local_target):
+    """Files not stored as public are only served with an access token"""
+    photo = FileStorage(data=io.BytesIO(PNG), name="avatar.png")
+    photo.save()
+
+    shard, subshard, name = photo.url.split("/")[-3:]
+    assert photo.url == f"/files/{shard}/{subshard}/{name}"
+    assert os.listdir(local_target / shard / subshard) == [name]
+
+    anonymous = test_app.test_client()
+    assert anonymous.get(photo.url).status_code == 401
+    traversal = f"/files/public/../{shard}/{subshard}/{name}"
+    assert anonymous.get(traversal).status_code == 401
+
+    admin_client = client("admin")
+    rv = admin_client.get(photo.url)
+    assert rv.status_code == 200
+    assert rv.data == PNG
+    rv.close()
+    assert admin_client.get("/files/../settings.py").status_code == 404
+
+
+def test_memory_storage(test_app: Flask, memory_target):
+    """Memory files keep their sniffed content type"""
+    photo = FileStorage(data=io.BytesIO(PNG), name="avatar.png", public=True)
+    photo.save()
+
+    with test_app.test_client() as client:
+        rv = client.get(photo.url)
+        assert (rv.data, rv.mimetype) == (PNG, "image/png")
+        assert FileStorage(url=photo.url).delete()
+        assert client.get(photo.url).status_code == 404
+
+
+def test_register_storage_handler(test_app: Flask):
+    """STORAGE_TARGET selects among registered handlers"""
+
+    @register_storage_handler("dummy")
+    class FileStorageDummy(FileStorageInterface):
+        def __init__(self, data, name, public=False, url=None) -> None:
+            self.file_url = url
+
+    try:
+        test_app.config["STORAGE_TARGET"] = "dummy"
+        with test_app.app_context():
+            assert isinstance(FileStorage(url="x").handler, FileStorageDummy)
+        assert test_app.test_client().get("/files/public/x").status_code == 404
+    finally:
+        del storage_handlers["dummy"]
+
+
+def test_content_addressed_dedup(test_app: Flask, memory_target):
+    """Identical uploads are stored once under their content's digest"""
+    urls = set()
+    for name in ["a.png", "b.png"]:
+        photo = FileStorage(data=io.BytesIO(PNG), name=name)
+        photo.save()
+        urls.add(photo.url)
+
+    assert urls == {f"/files/{hashlib.sha256(PNG).hexdigest()}.png"}
+    assert len(memory_target) == 1
+
+
+def test_image_variants(test_app: Flask, memory_target):
+    """Images are resized once on upload and their variants' urls derived"""
+    from PIL import Image
+
+    test_app.config["IMAGE_VARIANTS"] = {"small": 64, "medium": 256}
+    photo = FileStorage(
+        data=io.BytesIO(png_image(size=(300, 200))),
+        name="avatar.png",
+        public=True,
+        variants=True,
+    )
+    photo.save()
+
+    assert len(memory_target) == 3
+    assert set(photo.variants) == {"small", "medium"}
+    with test_app.test_client() as client:
+        for variant, size in [("small", (64, 43)), ("medium", (256, 171))]:
+            rv = client.get(photo.variants[variant])
+            assert rv.mimetype == "image/png"
+            assert Image.open(io.BytesIO(rv.data)).size == size
+
+    assert FileStorage(url="/files/abc123avatar.png").variants is None
+    assert FileStorage(url=photo.url).delete()
+    assert len(memory_target) == 0
+
+
+def test_image_variants_limits(test_app: Flask, memory_target):
+    """Oversized images are rejected undecoded, JPEGs are resized rotated"""
+    from PIL import Image
+
+    from app.exceptions import InvalidUsage
+
+    test_app.config["IMAGE_VARIANTS"] = {"small": 64, "medium": 256}
+    test_app.config["IMAGE_MAX_PIXELS"] = 300 * 200 - 1
+    photo = FileStorage(
+        data=io.BytesIO(png_image(size=(300, 200))), name="avatar.png", variants=True
+    )
+    with pytest.raises(InvalidUsage) as e:
+        photo.save()
+    assert e.value.status_code == 400
+    assert len(memory_target) == 0
+
+    test_app.config["IMAGE_MAX_PIXELS"] = 4096 * 4096
+    content = io.BytesIO()
+    exif = Image.Exif()
+    # rotated 90 degrees clockwise
+    exif[0x0112] = 6
+    Image.new("RGB", (3000, 2000), "red").save(content, "JPEG", exif=exif)
+    content.seek(0)
+    photo = FileStorage(data=content, name="avatar.jpg", public=True, variants=True)
+    photo.save()
+
+    with test_app.test_client() as client:
+        for variant, size in [("small", (43, 64)), ("medium", (171, 256))]:
+            rv = client.get(photo.variants[variant])
+            assert Image.open(io.BytesIO(rv.data)).size == size
+
+
+def test_shared_photo_release(test_app: Flask, client, memory_target):
+    """Users' photos are only deleted once no other user shares them"""
+    from flask_restx import marshal
+
+    from app.apis.v1.users.models import User
+    from app.apis.v1.users.resources import user_model
+    from app.database import db
+
+    client()
+    photo = FileStorage(data=io.BytesIO(png_image()), name="a.png", variants=True)
+    photo.save()
+    users = User.query.all()
+    for user in users:
+        user.photo = photo.url
+    db.session.commit()
+
+    data = marshal(users[0], user_model)
+    assert data["photoVariants"] == photo.variants
+
+    users[0].release_photo()
+    assert len(memory_target) == 3
+    users[0].photo = None
+    db.session.commit()
+    users[1].release_photo()
+    assert len(memory_target) == 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("target", ["local", "memory"])
+def test_storage_throughput(test_app: Flask, tmp_path, record_property, target: str):
+    """Round trips of 64KB files through the offline targets"""
+    test_app.config["STORAGE_TARGET"] = target
+    test_app.config["STORAGE_LOCAL_ROOT"] = str(tmp_path)
+    contents = [PNG + os.urandom(64 * 1024 - len(PNG)) for _ in range(50)]
+
+    with test_app.app_context(), test_app.test_client() as client:
+        start = time.perf_counter()
+        urls = []
+        for i, content in enumerate(contents):
+            photo = FileStorage(data=io.BytesIO(content), name=f"{i}.png", public=True)
+            photo.save()
+            urls.append(photo.url)
+        uploaded = time.perf_counter()
+        for url, content in zip(urls, contents):
+            rv = client.get(url)
+            assert rv.data == content
+            rv.close()
+        downloaded = time.perf_counter()
+        for url in urls:
+            FileStorage(url=url).delete()
+    memory_files.clear()
+
+    size = sum(len(content) for content in contents) / 1024 ** 2
+    record_property("upload_mb_per_s", size / (uploaded - start))
+    record_property("download_mb_per_s", size / (downloaded - uploaded))